@@ -9,109 +9,167 @@ Reusable dependencies for:
 - Permission checks
 """
 
-from fastapi import Depends, HTTPException, status, Request
-from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from datetime import datetime, timedelta
-from typing import Optional, Dict
+from fastapi import Depends, HTTPException, status, Request, Response
+from cachetools import TTLCache
+from typing import Optional, Deque
+from collections import deque
+import redis.asyncio as aioredis
+import functools
+import hashlib
+import hmac
+import inspect
 import time
+import uuid
 
-# OAuth2 scheme
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+from .security import oauth2_scheme, get_current_user, get_user_from_token
+from ..services.cache import get_redis
+from ..services.database import get_db
 
-# JWT configuration
-SECRET_KEY = "your-secret-key-change-in-production"
-ALGORITHM = "HS256"
+# Subscription tiers allowed at or above a given level
+_PRO_TIERS = frozenset(("pro", "business", "enterprise"))
+_BUSINESS_TIERS = frozenset(("business", "enterprise"))
+_ENTERPRISE_TIERS = frozenset(("enterprise",))
 
-# Rate limiting storage (in-memory, use Redis in production)
-rate_limit_storage: Dict[str, list] = {}
+# Feature -> (allowed tiers, minimum tier named in errors)
+_FEATURE_REQUIREMENTS = {
+    "batch_generation": (_PRO_TIERS, "pro"),
+    "auto_posting": (_PRO_TIERS, "pro"),
+    "white_label": (_BUSINESS_TIERS, "business"),
+    "api_access": (_PRO_TIERS, "pro"),
+    "4k_export": (_BUSINESS_TIERS, "business"),
+    "unlimited_exports": (_ENTERPRISE_TIERS, "enterprise"),
+    "priority_support": (_BUSINESS_TIERS, "business"),
+    "custom_branding": (_ENTERPRISE_TIERS, "enterprise")
+}
+_DEFAULT_FEATURE_REQUIREMENT = (frozenset(("free",)), "free")
+
+# Minimum tier -> allowed tiers (None = any tier)
+_TIERS_AT_LEAST = {
+    "free": None,
+    "pro": _PRO_TIERS,
+    "business": _BUSINESS_TIERS,
+    "enterprise": _ENTERPRISE_TIERS
+}
+
+# Usage limits by tier (-1 = unlimited)
+_VIDEO_GENERATION_LIMITS = {
+    "free": 5,          # 5 videos/month
+    "pro": 100,         # 100 videos/month
+    "business": 500,    # 500 videos/month
+    "enterprise": -1    # Unlimited
+}
+
+# Storage limits by tier (in GB, -1 = unlimited)
+_STORAGE_LIMITS_GB = {
+    "free": 1,
+    "pro": 50,
+    "business": 500,
+    "enterprise": -1
+}
+
+# API keys (stored and cached only as SHA-256 digests)
+API_KEY_PREFIX = b"vep_"
+API_KEY_CACHE_TTL_SECONDS = 60
+API_KEY_CACHE_MAXSIZE = 10_000
+
+# Max keys per limiter for the in-memory fallback (used when REDIS_URL is not set)
+RATE_LIMIT_STORAGE_MAXSIZE = 100_000
+
+# Sliding window in one atomic round-trip: trim expired entries, then either
+# reject ({0, oldest score} for Retry-After) or record ({1, remaining}).
+RATE_LIMIT_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+
+local count = redis.call('ZCARD', key)
+if count >= limit then
+    local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+    return {0, oldest[2]}
+end
+
+redis.call('ZADD', key, now, ARGV[4])
+redis.call('PEXPIRE', key, math.ceil(window * 1000))
+return {1, limit - count - 1}
+"""
 
 # ═══════════════════════════════════════════════════════════════
 # AUTHENTICATION DEPENDENCIES
 # ═══════════════════════════════════════════════════════════════
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
+def require_user(min_tier: str = "free", require_verified: bool = True):
     """
-    Dependency to get current authenticated user from JWT token
+    Dependency factory: authenticate and authorize in a single pass
+    
+    Args:
+        min_tier: Minimum subscription tier ("free", "pro", "business", "enterprise")
+        require_verified: Also require a verified, non-suspended account
+    
+    Usage:
+        @router.post("/endpoint")
+        async def endpoint(current_user: dict = Depends(require_user("pro"))):
+            ...
     """
     
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+    allowed_tiers = _TIERS_AT_LEAST[min_tier]
+    tier_detail = f"{min_tier.capitalize()} subscription required"
     
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        email: str = payload.get("email")
-        
-        if user_id is None or email is None:
-            raise credentials_exception
+    async def user_checker(token: str = Depends(oauth2_scheme), db = Depends(get_db)) -> dict:
+        current_user = await get_user_from_token(token, db)
         
-        # TODO: Fetch user from database
-        user = {
-            "id": user_id,
-            "email": email,
-            "full_name": "Test User",
-            "subscription_tier": "pro",
-            "is_verified": True
-        }
+        if require_verified:
+            if not current_user.get("is_verified"):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Email not verified"
+                )
+            
+            # Check if account is suspended
+            if current_user.get("is_suspended"):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Account suspended"
+                )
         
-        return user
+        if allowed_tiers is not None and current_user.get("subscription_tier") not in allowed_tiers:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=tier_detail
+            )
         
-    except JWTError:
-        raise credentials_exception
-
-async def get_current_active_user(current_user: dict = Depends(get_current_user)) -> dict:
-    """
-    Ensure user is active and verified
-    """
-    
-    if not current_user.get("is_verified"):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Email not verified"
-        )
-    
-    # Check if account is suspended
-    if current_user.get("is_suspended"):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Account suspended"
-        )
+        return current_user
     
-    return current_user
+    return user_checker
 
-async def get_current_pro_user(current_user: dict = Depends(get_current_active_user)) -> dict:
-    """
-    Ensure user has Pro subscription or higher
-    """
-    
-    allowed_tiers = ["pro", "business", "enterprise"]
-    
-    if current_user.get("subscription_tier") not in allowed_tiers:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Pro subscription required"
-        )
-    
-    return current_user
+# Active (verified, not suspended) user, any tier
+get_current_active_user = require_user()
+
+# Active user with Pro subscription or higher
+get_current_pro_user = require_user("pro")
 
-async def get_current_business_user(current_user: dict = Depends(get_current_active_user)) -> dict:
+# Active user with Business subscription or higher
+get_current_business_user = require_user("business")
+
+# ═══════════════════════════════════════════════════════════════
+# REDIS
+# ═══════════════════════════════════════════════════════════════
+
+_rate_limit_script = None
+
+def _get_rate_limit_script(redis: aioredis.Redis):
     """
-    Ensure user has Business subscription or higher
+    Register the sliding-window script once; it runs via EVALSHA and is
+    reloaded automatically on NOSCRIPT
     """
+    global _rate_limit_script
     
-    allowed_tiers = ["business", "enterprise"]
-    
-    if current_user.get("subscription_tier") not in allowed_tiers:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Business subscription required"
-        )
+    if _rate_limit_script is None:
+        _rate_limit_script = redis.register_script(RATE_LIMIT_SCRIPT)
     
-    return current_user
+    return _rate_limit_script
 
 # ═══════════════════════════════════════════════════════════════
 # RATE LIMITING
@@ -119,7 +177,7 @@ async def get_current_business_user(current_user: dict = Depends(get_current_act
 
 class RateLimiter:
     """
-    Rate limiter decorator for API endpoints
+    Rate limit dependency for API endpoints (per user, per route)
     """
     
     def __init__(self, limit: int, window: int):
@@ -130,45 +188,86 @@ class RateLimiter:
         """
         self.limit = limit
         self.window = window
-    
-    async def __call__(self, request: Request, current_user: dict = Depends(get_current_user)):
+        # In-memory fallback: a key expires one window after its last request,
+        # when all of its timestamps would have expired anyway
+        self._storage: TTLCache = TTLCache(maxsize=RATE_LIMIT_STORAGE_MAXSIZE, ttl=window)
+    
+    async def __call__(
+        self,
+        request: Request,
+        response: Response,
+        current_user: dict = Depends(get_current_user),
+        redis: Optional[aioredis.Redis] = Depends(get_redis)
+    ):
         """
         Check rate limit for user
         """
         
-        user_id = current_user["id"]
-        key = f"{user_id}:{request.url.path}"
+        # Route template (not the concrete URL) so path params share one bucket
+        route = request.scope.get("route")
+        path = route.path if route is not None else request.url.path
+        key = f"{path}:{current_user['id']}"
         
-        now = time.time()
+        if redis is not None:
+            # Wall-clock: scores are compared across workers and hosts
+            now = time.time()
+            allowed, value = await _get_rate_limit_script(redis)(
+                keys=[f"rl:{key}"],
+                args=[now, self.window, self.limit, uuid.uuid4().hex]
+            )
+            
+            if not allowed:
+                self._raise_limit_exceeded(int(self.window - (now - float(value))))
+            
+            self._set_limit_headers(response, int(value))
+            return True
+        
+        # In-process timestamps only need to be comparable with each other,
+        # so use the monotonic clock (immune to NTP jumps)
+        now = time.monotonic()
         
         # Initialize if not exists
-        if key not in rate_limit_storage:
-            rate_limit_storage[key] = []
+        timestamps: Optional[Deque[float]] = self._storage.get(key)
+        if timestamps is None:
+            timestamps = deque()
         
-        # Remove old requests outside window
-        rate_limit_storage[key] = [
-            timestamp for timestamp in rate_limit_storage[key]
-            if now - timestamp < self.window
-        ]
+        # Remove old requests outside window (timestamps are appended in order,
+        # so only the expired prefix is touched)
+        while timestamps and now - timestamps[0] >= self.window:
+            timestamps.popleft()
         
         # Check if limit exceeded
-        if len(rate_limit_storage[key]) >= self.limit:
-            retry_after = int(self.window - (now - rate_limit_storage[key][0]))
-            
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail=f"Rate limit exceeded. Try again in {retry_after} seconds.",
-                headers={"Retry-After": str(retry_after)}
-            )
+        if len(timestamps) >= self.limit:
+            self._raise_limit_exceeded(int(self.window - (now - timestamps[0])))
         
-        # Add current request
-        rate_limit_storage[key].append(now)
+        # Add current request (re-setting the key restarts its TTL)
+        timestamps.append(now)
+        self._storage[key] = timestamps
         
+        self._set_limit_headers(response, self.limit - len(timestamps))
         return True
+    
+    def _set_limit_headers(self, response: Response, remaining: int):
+        response.headers["X-RateLimit-Limit"] = str(self.limit)
+        response.headers["X-RateLimit-Remaining"] = str(remaining)
+    
+    def _raise_limit_exceeded(self, retry_after: int):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Rate limit exceeded. Try again in {retry_after} seconds.",
+            headers={
+                "Retry-After": str(retry_after),
+                "X-RateLimit-Limit": str(self.limit),
+                "X-RateLimit-Remaining": "0"
+            }
+        )
 
 def rate_limit(limit: int, window: int):
     """
-    Rate limiter factory
+    Rate limiter decorator
+    
+    Adds a RateLimiter dependency to the endpoint's signature, so FastAPI
+    resolves it (and rejects with 429) before the handler body runs.
     
     Usage:
         @router.get("/endpoint")
@@ -176,23 +275,40 @@ def rate_limit(limit: int, window: int):
         async def endpoint():
             ...
     """
-    return RateLimiter(limit=limit, window=window)
-
-# ═══════════════════════════════════════════════════════════════
-# DATABASE DEPENDENCIES
-# ═══════════════════════════════════════════════════════════════
+    
+    limiter = RateLimiter(limit=limit, window=window)
+    
+    def decorator(endpoint):
+        signature = inspect.signature(endpoint)
+        parameters = [
+            *signature.parameters.values(),
+            inspect.Parameter(
+                "_rate_limit",
+                inspect.Parameter.KEYWORD_ONLY,
+                default=Depends(limiter)
+            )
+        ]
+        
+        @functools.wraps(endpoint)
+        async def wrapper(*args, _rate_limit=None, **kwargs):
+            return await endpoint(*args, **kwargs)
+        
+        wrapper.__signature__ = signature.replace(parameters=parameters)
+        return wrapper
+    
+    return decorator
 
-async def get_db():
+def rate_limit_per_minute(limit: int):
     """
-    Get database session
+    Rate limiter decorator with a one-minute window
+    
+    Usage:
+        @router.post("/endpoint")
+        @rate_limit_per_minute(limit=10)
+        async def endpoint():
+            ...
     """
-    # TODO: Implement database session management
-    db = None
-    try:
-        yield db
-    finally:
-        if db:
-            await db.close()
+    return rate_limit(limit=limit, window=60)
 
 # ═══════════════════════════════════════════════════════════════
 # PERMISSION CHECKS
@@ -209,7 +325,7 @@ def require_permission(permission: str):
     """
     
     async def permission_checker(current_user: dict = Depends(get_current_user)):
-        # TODO: Check user permissions from database
+        # Permissions are loaded with the user record (once per request)
         user_permissions = current_user.get("permissions", [])
         
         if permission not in user_permissions and "admin" not in user_permissions:
@@ -222,6 +338,24 @@ def require_permission(permission: str):
     
     return permission_checker
 
+async def require_admin(current_user: dict = Depends(get_current_user)) -> dict:
+    """
+    Dependency: the current user, or 403 unless they are an admin
+    
+    Usage:
+        @router.get("/admin/endpoint")
+        async def endpoint(current_user: dict = Depends(require_admin)):
+            ...
+    """
+    
+    if not current_user.get("is_admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    
+    return current_user
+
 # ═══════════════════════════════════════════════════════════════
 # SUBSCRIPTION TIER CHECKS
 # ═══════════════════════════════════════════════════════════════
@@ -238,25 +372,15 @@ def check_feature_access(feature: str):
     - 4k_export: Business+
     """
     
-    feature_requirements = {
-        "batch_generation": ["pro", "business", "enterprise"],
-        "auto_posting": ["pro", "business", "enterprise"],
-        "white_label": ["business", "enterprise"],
-        "api_access": ["pro", "business", "enterprise"],
-        "4k_export": ["business", "enterprise"],
-        "unlimited_exports": ["enterprise"],
-        "priority_support": ["business", "enterprise"],
-        "custom_branding": ["enterprise"]
-    }
+    required_tiers, minimum_tier = _FEATURE_REQUIREMENTS.get(feature, _DEFAULT_FEATURE_REQUIREMENT)
     
     async def feature_checker(current_user: dict = Depends(get_current_active_user)):
-        required_tiers = feature_requirements.get(feature, ["free"])
         user_tier = current_user.get("subscription_tier", "free")
         
         if user_tier not in required_tiers:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Feature '{feature}' requires {required_tiers[0]} subscription or higher"
+                detail=f"Feature '{feature}' requires {minimum_tier} subscription or higher"
             )
         
         return current_user
@@ -272,22 +396,14 @@ async def check_video_generation_limit(current_user: dict = Depends(get_current_
     Check if user has remaining video generation quota
     """
     
-    # Usage limits by tier
-    limits = {
-        "free": 5,          # 5 videos/month
-        "pro": 100,         # 100 videos/month
-        "business": 500,    # 500 videos/month
-        "enterprise": -1    # Unlimited
-    }
-    
     tier = current_user.get("subscription_tier", "free")
-    limit = limits.get(tier, 5)
+    limit = _VIDEO_GENERATION_LIMITS.get(tier, 5)
     
     if limit == -1:  # Unlimited
         return current_user
     
-    # TODO: Check actual usage from database
-    current_usage = 0
+    # Usage counters are loaded with the user record (once per request)
+    current_usage = current_user.get("videos_generated_this_month", 0)
     
     if current_usage >= limit:
         raise HTTPException(
@@ -302,22 +418,14 @@ async def check_storage_limit(file_size: int, current_user: dict = Depends(get_c
     Check if user has enough storage space
     """
     
-    # Storage limits by tier (in GB)
-    storage_limits = {
-        "free": 1,
-        "pro": 50,
-        "business": 500,
-        "enterprise": -1  # Unlimited
-    }
-    
     tier = current_user.get("subscription_tier", "free")
-    limit_gb = storage_limits.get(tier, 1)
+    limit_gb = _STORAGE_LIMITS_GB.get(tier, 1)
     
     if limit_gb == -1:  # Unlimited
         return current_user
     
-    # TODO: Check actual storage usage from database
-    current_usage_bytes = 0
+    # Usage counters are loaded with the user record (once per request)
+    current_usage_bytes = current_user.get("storage_used_bytes", 0)
     limit_bytes = limit_gb * 1024 * 1024 * 1024
     
     if current_usage_bytes + file_size > limit_bytes:
@@ -332,22 +440,49 @@ async def check_storage_limit(file_size: int, current_user: dict = Depends(get_c
 # API KEY AUTHENTICATION (for programmatic access)
 # ═══════════════════════════════════════════════════════════════
 
+_api_key_cache: TTLCache = TTLCache(maxsize=API_KEY_CACHE_MAXSIZE, ttl=API_KEY_CACHE_TTL_SECONDS)
+
+def hash_api_key(api_key: str) -> str:
+    """
+    Digest under which an API key is stored and cached (raw keys are never kept)
+    """
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
 async def verify_api_key(api_key: str) -> dict:
     """
     Verify API key for programmatic access
     """
     
-    # TODO: Verify API key from database
-    
-    if not api_key or not api_key.startswith("vep_"):
+    if not api_key or not hmac.compare_digest(api_key.encode()[:len(API_KEY_PREFIX)], API_KEY_PREFIX):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API key"
         )
     
+    key_hash = hash_api_key(api_key)
+    
+    user = _api_key_cache.get(key_hash)
+    if user is not None:
+        return user
+    
+    # TODO: Look up key_hash in the database
+    
     # Return associated user
-    return {
+    user = {
         "id": "api_user_id",
         "email": "api@example.com",
         "subscription_tier": "pro"
     }
+    
+    _api_key_cache[key_hash] = user
+    
+    return user
+
+def evict_api_key(key_hash: str):
+    """
+    Drop a revoked key from the validation cache
+    
+    Call right after revoking the key in the database so it stops working
+    immediately instead of after the cache TTL.
+    """
+    _api_key_cache.pop(key_hash, None)
@@ -11,25 +11,31 @@ JWT-based authentication with:
 """
 
 from fastapi import APIRouter, HTTPException, Depends, status, Response
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, EmailStr, Field
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from datetime import datetime, timedelta
+from jwt import InvalidTokenError
+from datetime import datetime
 from typing import Optional
+import asyncio
 import secrets
+import time
 import uuid
 
-router = APIRouter(prefix="/api/auth", tags=["auth"])
+from ..security import pwd_context, jwt_validator, get_current_user, load_login_user
+from ...services.database import get_db
 
-# Security configuration
-SECRET_KEY = "your-secret-key-change-in-production"  # TODO: Move to env
-ALGORITHM = "HS256"
+router = APIRouter(prefix="/api/auth", tags=["auth"], default_response_class=ORJSONResponse)
+
+# Token lifetimes (key, algorithm and hashing live in api/security.py)
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
+MAGIC_LINK_EXPIRE_MINUTES = 15
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+# Derived once at import; none of these change at runtime
+_ACCESS_TTL_SECONDS = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+_REFRESH_TTL_SECONDS = REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
+_MAGIC_LINK_TTL_SECONDS = MAGIC_LINK_EXPIRE_MINUTES * 60
 
 # ═══════════════════════════════════════════════════════════════
 # REQUEST/RESPONSE MODELS
@@ -54,7 +60,7 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     user_id: str
     email: str
-    exp: datetime
+    exp: int  # Unix epoch seconds
 
 class UserResponse(BaseModel):
     id: str
@@ -79,64 +85,36 @@ class ConfirmPasswordReset(BaseModel):
 # HELPER FUNCTIONS
 # ═══════════════════════════════════════════════════════════════
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: Optional[str]) -> bool:
+    """Verify a password against its hash (bcrypt runs in the threadpool, off the event loop)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, pwd_context.verify, plain_password, hashed_password)
 
-def get_password_hash(password: str) -> str:
-    """Hash a password"""
-    return pwd_context.hash(password)
+async def get_password_hash(password: str) -> str:
+    """Hash a password (bcrypt runs in the threadpool, off the event loop)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, pwd_context.hash, password)
 
 def create_access_token(data: dict) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    expire = int(time.time()) + _ACCESS_TTL_SECONDS
     to_encode.update({"exp": expire, "type": "access"})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return jwt_validator.sign(to_encode)
 
 def create_refresh_token(data: dict) -> str:
     """Create JWT refresh token"""
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    expire = int(time.time()) + _REFRESH_TTL_SECONDS
     to_encode.update({"exp": expire, "type": "refresh"})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return jwt_validator.sign(to_encode)
 
 def create_magic_link_token(email: str) -> str:
     """Create magic link token"""
     data = {"email": email, "purpose": "magic_link"}
-    expire = datetime.utcnow() + timedelta(minutes=15)
+    expire = int(time.time()) + _MAGIC_LINK_TTL_SECONDS
     data.update({"exp": expire})
-    return jwt.encode(data, SECRET_KEY, algorithm=ALGORITHM)
-
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
-    """Dependency to get current authenticated user"""
-    
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        email: str = payload.get("email")
-        
-        if user_id is None or email is None:
-            raise credentials_exception
-        
-        # TODO: Fetch user from database
-        user = {
-            "id": user_id,
-            "email": email,
-            "full_name": "Test User",
-            "subscription_tier": "pro"
-        }
-        
-        return user
-        
-    except JWTError:
-        raise credentials_exception
+    return jwt_validator.sign(data)
 
 # ═══════════════════════════════════════════════════════════════
 # AUTHENTICATION ENDPOINTS
@@ -164,7 +142,7 @@ async def register_user(user: UserRegister):
         )
     
     # Hash password
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash(user.password)
     
     # Create user
     user_id = str(uuid.uuid4())
@@ -187,7 +165,7 @@ async def register_user(user: UserRegister):
     return UserResponse(**new_user)
 
 @router.post("/login", response_model=Token)
-async def login(user: UserLogin):
+async def login(user: UserLogin, db = Depends(get_db)):
     """
     Login with email and password
     
@@ -196,16 +174,12 @@ async def login(user: UserLogin):
     - Refresh token (7 day expiry)
     """
     
-    # TODO: Fetch user from database
-    db_user = {
-        "id": str(uuid.uuid4()),
-        "email": user.email,
-        "password_hash": get_password_hash(user.password),
-        "is_verified": True
-    }
+    db_user = await load_login_user(db, user.email)
     
-    # Verify password
-    if not verify_password(user.password, db_user["password_hash"]):
+    # Verify password against the stored hash. An unknown email still runs a
+    # (dummy) bcrypt verify, so response time doesn't reveal which emails exist
+    password_hash = db_user["password_hash"] if db_user else None
+    if not await verify_password(user.password, password_hash) or db_user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -225,7 +199,7 @@ async def login(user: UserLogin):
     return Token(
         access_token=access_token,
         refresh_token=refresh_token,
-        expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        expires_in=_ACCESS_TTL_SECONDS
     )
 
 @router.post("/refresh", response_model=Token)
@@ -235,7 +209,7 @@ async def refresh_access_token(refresh_token: str):
     """
     
     try:
-        payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt_validator.verify(refresh_token)
         
         if payload.get("type") != "refresh":
             raise HTTPException(
@@ -253,10 +227,10 @@ async def refresh_access_token(refresh_token: str):
         return Token(
             access_token=new_access_token,
             refresh_token=new_refresh_token,
-            expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60
+            expires_in=_ACCESS_TTL_SECONDS
         )
         
-    except JWTError:
+    except InvalidTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid refresh token"
@@ -299,7 +273,7 @@ async def verify_magic_link(token: str):
     """
     
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt_validator.verify(token)
         
         if payload.get("purpose") != "magic_link":
             raise HTTPException(
@@ -322,10 +296,10 @@ async def verify_magic_link(token: str):
         return Token(
             access_token=access_token,
             refresh_token=refresh_token,
-            expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60
+            expires_in=_ACCESS_TTL_SECONDS
         )
         
-    except JWTError:
+    except InvalidTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired magic link"
@@ -373,14 +347,14 @@ async def verify_email(token: str):
     """
     
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt_validator.verify(token)
         email = payload.get("email")
         
         # TODO: Update user as verified in database
         
         return {"message": "Email verified successfully"}
         
-    except JWTError:
+    except InvalidTokenError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid or expired verification token"
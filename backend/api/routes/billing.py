@@ -3,13 +3,33 @@ Billing & Subscription API Routes
 Stripe checkout, subscriptions, webhooks
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Header
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, EmailStr
 from typing import Optional
-from ..dependencies import get_current_user, rate_limit_per_minute
-from ...services.stripe_integration import StripeService, UsageLimiter
-
-router = APIRouter()
+from ..dependencies import get_current_user, get_db, rate_limit_per_minute, require_admin
+from ...services.stripe_integration import (
+    StripeService,
+    UsageLimiter,
+    is_event_processed,
+    mark_event_processed,
+    peek_event_id,
+    processed_event_cache_key,
+    PROCESSED_EVENT_CACHE_TTL_SECONDS,
+    event_claim_key,
+    EVENT_CLAIM_TTL_SECONDS,
+    WEBHOOK_HANDLERS,
+    subscription_cache_key,
+    SUBSCRIPTION_CACHE_TTL_SECONDS,
+    idempotent_response_cache_key,
+    IDEMPOTENT_RESPONSE_TTL_SECONDS
+)
+from ...services.cache import get_generic_cache, set_generic_cache, delete_generic_cache, claim_once
+
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Stripe events are a few KB; anything near this is not a real delivery
+MAX_WEBHOOK_BODY_BYTES = 1_000_000
 stripe_service = StripeService()
 usage_limiter = UsageLimiter()
 
@@ -48,11 +68,23 @@ class CreatePromoCodeRequest(BaseModel):
 @rate_limit_per_minute(limit=10)
 async def create_checkout_session(
     request: CreateCheckoutRequest,
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None)
 ):
     """
     Create Stripe Checkout session for subscription
+    
+    Retries with the same Idempotency-Key replay the first response instead
+    of creating a second customer and session. Requests without the header
+    are never deduplicated.
     """
+    cache_key = None
+    if idempotency_key:
+        cache_key = idempotent_response_cache_key(current_user["id"], idempotency_key)
+        cached = await get_generic_cache(cache_key)
+        if cached is not None:
+            return cached
+    
     try:
         # Ensure user has Stripe customer ID
         if not current_user.get("stripe_customer_id"):
@@ -60,7 +92,8 @@ async def create_checkout_session(
             customer = await stripe_service.create_customer(
                 email=current_user["email"],
                 name=current_user.get("full_name", ""),
-                metadata={"user_id": current_user["id"]}
+                metadata={"user_id": current_user["id"]},
+                idempotency_key=f"{idempotency_key}:customer" if idempotency_key else None
             )
             # TODO: Update user in database with customer_id
             customer_id = customer["customer_id"]
@@ -73,13 +106,18 @@ async def create_checkout_session(
             price_id=request.price_id,
             success_url=request.success_url,
             cancel_url=request.cancel_url,
-            metadata={"user_id": current_user["id"]}
+            metadata={"user_id": current_user["id"]},
+            idempotency_key=f"{idempotency_key}:session" if idempotency_key else None
         )
 
-        return {
+        response = {
             "success": True,
             "data": session
         }
+        if cache_key is not None:
+            await set_generic_cache(cache_key, response, IDEMPOTENT_RESPONSE_TTL_SECONDS)
+        
+        return response
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -88,11 +126,22 @@ async def create_checkout_session(
 @rate_limit_per_minute(limit=5)
 async def create_subscription(
     request: CreateSubscriptionRequest,
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None)
 ):
     """
     Create subscription directly (requires payment method attached)
+    
+    Idempotent per Idempotency-Key when the client sends one; without it,
+    every request creates a subscription.
     """
+    cache_key = None
+    if idempotency_key:
+        cache_key = idempotent_response_cache_key(current_user["id"], idempotency_key)
+        cached = await get_generic_cache(cache_key)
+        if cached is not None:
+            return cached
+    
     try:
         if not current_user.get("stripe_customer_id"):
             raise HTTPException(
@@ -103,15 +152,20 @@ async def create_subscription(
         subscription = await stripe_service.create_subscription(
             customer_id=current_user["stripe_customer_id"],
             price_id=request.price_id,
-            trial_days=request.trial_days
+            trial_days=request.trial_days,
+            idempotency_key=idempotency_key
         )
 
         # TODO: Update database with subscription details
         
-        return {
+        response = {
             "success": True,
             "data": subscription
         }
+        if cache_key is not None:
+            await set_generic_cache(cache_key, response, IDEMPOTENT_RESPONSE_TTL_SECONDS)
+        
+        return response
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -132,9 +186,13 @@ async def get_subscription(current_user = Depends(get_current_user)):
                 }
             }
 
-        subscription = await stripe_service.get_subscription(
-            current_user["stripe_subscription_id"]
-        )
+        subscription_id = current_user["stripe_subscription_id"]
+        cache_key = subscription_cache_key(subscription_id)
+
+        subscription = await get_generic_cache(cache_key)
+        if subscription is None:
+            subscription = await stripe_service.get_subscription(subscription_id)
+            await set_generic_cache(cache_key, subscription, SUBSCRIPTION_CACHE_TTL_SECONDS)
 
         return {
             "success": True,
@@ -161,6 +219,7 @@ async def update_subscription(
             subscription_id=current_user["stripe_subscription_id"],
             new_price_id=request.new_price_id
         )
+        await delete_generic_cache(subscription_cache_key(current_user["stripe_subscription_id"]))
 
         # TODO: Update database
 
@@ -190,6 +249,7 @@ async def cancel_subscription(
             subscription_id=current_user["stripe_subscription_id"],
             at_period_end=request.at_period_end
         )
+        await delete_generic_cache(subscription_cache_key(current_user["stripe_subscription_id"]))
 
         # TODO: Update database
 
@@ -255,43 +315,102 @@ async def get_usage(current_user = Depends(get_current_user)):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+async def _read_webhook_body(request: Request) -> bytes:
+    """Read the body, refusing (413) anything over the webhook size cap"""
+    content_length = request.headers.get("content-length")
+    if content_length and int(content_length) > MAX_WEBHOOK_BODY_BYTES:
+        raise HTTPException(status_code=413, detail="Payload too large")
+
+    # Content-Length can be absent (chunked) or wrong; enforce while reading
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_WEBHOOK_BODY_BYTES:
+            raise HTTPException(status_code=413, detail="Payload too large")
+
+    return bytes(body)
+
+
 @router.post("/webhook")
-async def stripe_webhook(request: Request):
+async def stripe_webhook(request: Request, db = Depends(get_db)):
     """
     Handle Stripe webhook events
+
+    Stripe retries deliveries, so each event id is applied at most once.
+    Without DATABASE_URL the dedupe is the Redis cache alone.
     """
+    sig_header = request.headers.get("stripe-signature")
+    if not sig_header:
+        raise HTTPException(status_code=400, detail="Missing signature")
+
+    payload = await _read_webhook_body(request)
+
+    # Replay of an event we already verified and applied: skip the HMAC entirely
+    event_id = peek_event_id(payload)
+    if event_id and await get_generic_cache(processed_event_cache_key(event_id)):
+        return {
+            "success": True,
+            "duplicate": True
+        }
+
     try:
-        payload = await request.body()
-        sig_header = request.headers.get("stripe-signature")
 
-        if not sig_header:
-            raise HTTPException(status_code=400, detail="Missing signature")
+        event = stripe_service.construct_event(payload, sig_header)
 
-        result = await stripe_service.handle_webhook(payload, sig_header)
+        # Types we don't handle: acknowledge right away, no dedupe round-trip
+        if event["type"] not in WEBHOOK_HANDLERS:
+            return {
+                "success": True,
+                "ignored": True
+            }
+
+        # Another delivery of this event is being applied right now: answer
+        # non-2xx so Stripe retries later, by when it is recorded as processed
+        claim_key = event_claim_key(event["id"])
+        if not await claim_once(claim_key, "1", EVENT_CLAIM_TTL_SECONDS):
+            raise HTTPException(status_code=409, detail="Event is already being processed")
+
+        try:
+            # Already applied: acknowledge with 200 so Stripe stops retrying
+            if db is not None and await is_event_processed(db, event["id"]):
+                await set_generic_cache(
+                    processed_event_cache_key(event["id"]), True, PROCESSED_EVENT_CACHE_TTL_SECONDS
+                )
+                return {
+                    "success": True,
+                    "duplicate": True
+                }
+
+            result = await stripe_service.dispatch_event(event)
+            if db is not None:
+                await mark_event_processed(db, event["id"], event["type"])
+            await set_generic_cache(
+                processed_event_cache_key(event["id"]), True, PROCESSED_EVENT_CACHE_TTL_SECONDS
+            )
+        finally:
+            await delete_generic_cache(claim_key)
 
         return {
             "success": True,
             "data": result
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 # Admin Routes (require admin permission)
 
-@router.post("/admin/promo-code", dependencies=[Depends(get_current_user)])
+@router.post("/admin/promo-code")
 @rate_limit_per_minute(limit=5)
 async def create_promo_code(
     request: CreatePromoCodeRequest,
-    current_user = Depends(get_current_user)
+    current_user = Depends(require_admin)
 ):
     """
     Create promotional discount code (admin only)
     """
-    # TODO: Check if user is admin
-    if not current_user.get("is_admin"):
-        raise HTTPException(status_code=403, detail="Admin access required")
-
     try:
         from ...services.stripe_integration import create_promo_code
         
@@ -311,14 +430,11 @@ async def create_promo_code(
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get("/admin/stats", dependencies=[Depends(get_current_user)])
-async def get_billing_stats(current_user = Depends(get_current_user)):
+@router.get("/admin/stats")
+async def get_billing_stats(current_user = Depends(require_admin)):
     """
     Get billing stats (admin only)
     """
-    if not current_user.get("is_admin"):
-        raise HTTPException(status_code=403, detail="Admin access required")
-
     # TODO: Query database for real stats
     stats = {
         "total_subscribers": 247,
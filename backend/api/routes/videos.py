@@ -10,21 +10,39 @@ Complete video generation endpoints with:
 - Status tracking
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, File, UploadFile
+from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, Request, Response
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
-import uuid
 
-from ...services.video_engine_production import (
-    ProductionVideoEngine,
-    CaptionStyle,
-    PLATFORM_CONFIGS
-)
+from ...services.video_engine_production import PLATFORM_CONFIGS
 from ...services.storage_manager import StorageManager
+from ...services.ids import uuid7, uuid7_batch
+from ...services.http_cache import conditional_status_response
+from ...services import video_queue
+from ...services.video_queue import acquire_video_slots, release_video_slots, MAX_CONCURRENT_VIDEOS
 from ..dependencies import get_current_user, rate_limit
 
-router = APIRouter(prefix="/api/videos", tags=["videos"])
+router = APIRouter(prefix="/api/videos", tags=["videos"], default_response_class=ORJSONResponse)
+
+# Shared storage client (one boto3 client/connection pool per process)
+_storage = StorageManager()
+
+# Platform validation, computed once at import
+_ALLOWED_PLATFORMS = frozenset(PLATFORM_CONFIGS)
+_ALLOWED_PLATFORMS_STR = ", ".join(sorted(_ALLOWED_PLATFORMS))
+
+# Upload limits (bytes) and presigned PUT lifetime
+MAX_BACKGROUND_UPLOAD_BYTES = 5 * 1024 * 1024 * 1024
+MAX_MUSIC_UPLOAD_BYTES = 100 * 1024 * 1024
+UPLOAD_PRESIGN_EXPIRE_SECONDS = 3600
+
+# kind -> (folder, extension, content type prefix, max bytes)
+_UPLOAD_KINDS = {
+    "background": ("backgrounds", "mp4", "video/", MAX_BACKGROUND_UPLOAD_BYTES),
+    "music": ("music", "mp3", "audio/", MAX_MUSIC_UPLOAD_BYTES),
+}
 
 # ═══════════════════════════════════════════════════════════════
 # REQUEST/RESPONSE MODELS
@@ -87,7 +105,6 @@ class VideoStatusResponse(BaseModel):
 @rate_limit(limit=10, window=60)
 async def generate_video(
     request: VideoGenerationRequest,
-    background_tasks: BackgroundTasks,
     current_user = Depends(get_current_user)
 ):
     """
@@ -96,26 +113,33 @@ async def generate_video(
     Rate limit: 10 requests per minute
     """
     
-    video_id = str(uuid.uuid4())
+    video_id = str(uuid7())
     
     # Validate template exists
     # TODO: Add template validation
     
     # Validate platform
-    if request.platform not in PLATFORM_CONFIGS:
+    if request.platform not in _ALLOWED_PLATFORMS:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid platform. Must be one of: {list(PLATFORM_CONFIGS.keys())}"
+            detail=f"Invalid platform. Must be one of: {_ALLOWED_PLATFORMS_STR}"
         )
     
-    # Queue video generation as background task
-    background_tasks.add_task(
-        process_video_generation,
-        video_id=video_id,
-        request=request,
-        user_id=current_user['id']
+    # Reserve render capacity (429 per-user limit, 503 when the render fleet is saturated)
+    await acquire_video_slots(
+        current_user['id'],
+        current_user.get('subscription_tier', 'free'),
+        [video_id]
     )
     
+    # Queue video generation on the render workers (give the slot back if
+    # the broker is unreachable, or the user is locked out until it goes stale)
+    try:
+        video_queue.generate_video.delay(video_id, request.dict(), current_user['id'])
+    except Exception:
+        await release_video_slots(current_user['id'], [video_id])
+        raise
+    
     return VideoResponse(
         video_id=video_id,
         status="queued",
@@ -127,36 +151,40 @@ async def generate_video(
 @rate_limit(limit=5, window=300)
 async def batch_generate_videos(
     request: BatchVideoRequest,
-    background_tasks: BackgroundTasks,
     current_user = Depends(get_current_user)
 ):
     """
     Generate multiple videos in batch
     
     Rate limit: 5 batch requests per 5 minutes
-    Max videos per batch: 50
+    Max videos per batch: the tier's concurrent render limit (free 1,
+    pro 5, business 20, enterprise 50), since the whole batch renders at once
     """
     
-    if len(request.videos) > 50:
+    tier = current_user.get('subscription_tier', 'free')
+    max_batch = MAX_CONCURRENT_VIDEOS.get(tier, 1)
+    if len(request.videos) > max_batch:
         raise HTTPException(
             status_code=400,
-            detail="Maximum 50 videos per batch"
+            detail=f"Maximum {max_batch} videos per batch on the {tier} plan"
         )
     
-    batch_id = str(uuid.uuid4())
-    video_ids = []
-    
-    for video_req in request.videos:
-        video_id = str(uuid.uuid4())
-        video_ids.append(video_id)
-        
-        background_tasks.add_task(
-            process_video_generation,
-            video_id=video_id,
-            request=video_req,
-            user_id=current_user['id'],
-            batch_id=batch_id
-        )
+    batch_id, *video_ids = map(str, uuid7_batch(len(request.videos) + 1))
+    
+    await acquire_video_slots(current_user['id'], tier, video_ids)
+    
+    for i, (video_id, video_req) in enumerate(zip(video_ids, request.videos)):
+        try:
+            video_queue.generate_video.delay(
+                video_id,
+                video_req.dict(),
+                current_user['id'],
+                batch_id=batch_id
+            )
+        except Exception:
+            # Renders already queued release their own slots when they finish
+            await release_video_slots(current_user['id'], video_ids[i:])
+            raise
     
     return {
         "batch_id": batch_id,
@@ -169,19 +197,26 @@ async def batch_generate_videos(
 @router.get("/status/{video_id}", response_model=VideoStatusResponse)
 async def get_video_status(
     video_id: str,
+    request: Request,
+    response: Response,
     current_user = Depends(get_current_user)
 ):
     """
-    Get generation status for a specific video
+    Get generation status for a specific video (ETag / 304 when unchanged)
     """
     
     # TODO: Fetch from database
     # For now, return mock response
+    status, progress = "processing", 0.65
+    
+    not_modified = conditional_status_response(request, response, status, progress)
+    if not_modified:
+        return not_modified
     
     return VideoStatusResponse(
         video_id=video_id,
-        status="processing",
-        progress=0.65,
+        status=status,
+        progress=progress,
         current_step="Compositing layers",
         estimated_completion=None
     )
@@ -254,17 +289,15 @@ async def trim_video(
     video_id: str,
     start_time: float,
     end_time: float,
-    background_tasks: BackgroundTasks,
     current_user = Depends(get_current_user)
 ):
     """
     Trim a video to specific duration
     """
     
-    new_video_id = str(uuid.uuid4())
+    new_video_id = str(uuid7())
     
-    background_tasks.add_task(
-        process_video_trim,
+    video_queue.trim_video.delay(
         original_video_id=video_id,
         new_video_id=new_video_id,
         start_time=start_time,
@@ -282,23 +315,21 @@ async def trim_video(
 async def optimize_for_platform(
     video_id: str,
     target_platform: str,
-    background_tasks: BackgroundTasks,
     current_user = Depends(get_current_user)
 ):
     """
     Re-optimize video for different platform
     """
     
-    if target_platform not in PLATFORM_CONFIGS:
+    if target_platform not in _ALLOWED_PLATFORMS:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid platform. Must be one of: {list(PLATFORM_CONFIGS.keys())}"
+            detail=f"Invalid platform. Must be one of: {_ALLOWED_PLATFORMS_STR}"
         )
     
-    new_video_id = str(uuid.uuid4())
+    new_video_id = str(uuid7())
     
-    background_tasks.add_task(
-        process_platform_optimization,
+    video_queue.optimize_video.delay(
         original_video_id=video_id,
         new_video_id=new_video_id,
         target_platform=target_platform,
@@ -322,7 +353,7 @@ async def upload_background_video(
     current_user = Depends(get_current_user)
 ):
     """
-    Upload custom background video
+    Upload custom background video (streamed to storage in parts)
     """
     
     # Validate file type
@@ -332,20 +363,17 @@ async def upload_background_video(
             detail="File must be a video"
         )
     
-    # TODO: Upload to storage
-    storage = StorageManager()
-    
-    file_id = str(uuid.uuid4())
+    file_id = str(uuid7())
     file_path = f"uploads/{current_user['id']}/backgrounds/{file_id}.mp4"
     
-    # Save file
-    # storage.upload_file(file, file_path)
+    uploaded = await _stream_upload(file, file_path, MAX_BACKGROUND_UPLOAD_BYTES)
     
     return {
         "file_id": file_id,
         "file_path": file_path,
         "filename": file.filename,
-        "size": 0  # TODO: Get actual size
+        "url": uploaded["url"],
+        "size": uploaded["size"]
     }
 
 @router.post("/upload/music")
@@ -354,7 +382,7 @@ async def upload_music(
     current_user = Depends(get_current_user)
 ):
     """
-    Upload custom music track
+    Upload custom music track (streamed to storage in parts)
     """
     
     # Validate file type
@@ -364,100 +392,113 @@ async def upload_music(
             detail="File must be an audio file"
         )
     
-    file_id = str(uuid.uuid4())
+    file_id = str(uuid7())
     file_path = f"uploads/{current_user['id']}/music/{file_id}.mp3"
     
+    uploaded = await _stream_upload(file, file_path, MAX_MUSIC_UPLOAD_BYTES)
+    
     return {
         "file_id": file_id,
         "file_path": file_path,
-        "filename": file.filename
+        "filename": file.filename,
+        "url": uploaded["url"],
+        "size": uploaded["size"]
     }
 
-# ═══════════════════════════════════════════════════════════════
-# BACKGROUND PROCESSING FUNCTIONS
-# ═══════════════════════════════════════════════════════════════
+def _upload_kind(kind: str):
+    """(folder, extension, content type prefix, max bytes) for an upload kind; 404 if unknown"""
+    if kind not in _UPLOAD_KINDS:
+        raise HTTPException(
+            status_code=404,
+            detail="Unknown upload type. Must be 'background' or 'music'"
+        )
+    return _UPLOAD_KINDS[kind]
 
-async def process_video_generation(
-    video_id: str,
-    request: VideoGenerationRequest,
-    user_id: str,
-    batch_id: Optional[str] = None
+@router.post("/upload/{kind}/presign")
+async def presign_upload(
+    kind: str,
+    content_type: str,
+    current_user = Depends(get_current_user)
 ):
     """
-    Background task to generate video
+    Get a presigned PUT so the client uploads directly to storage
+
+    Preferred for large files: the bytes never pass through the API. The
+    client PUTs the file with the same Content-Type, then calls
+    /upload/{kind}/{file_id}/complete to have its size checked.
     """
     
-    try:
-        # Update status to processing
-        # TODO: Update in database
-        
-        # Initialize video engine
-        engine = ProductionVideoEngine()
-        
-        # Convert caption requests to CaptionStyle objects
-        captions = [
-            CaptionStyle(
-                text=cap.text,
-                font=cap.font,
-                size=cap.size,
-                color=cap.color,
-                position=cap.position,
-                animation=cap.animation,
-                highlight=cap.highlight,
-                outline_color=cap.outline_color,
-                outline_width=cap.outline_width,
-                shadow=cap.shadow,
-                start_time=cap.start_time,
-                end_time=cap.end_time
-            )
-            for cap in request.captions
-        ]
-        
-        # Generate video
-        output_path = engine.create_viral_video(
-            template_id=request.template_id,
-            script=request.script,
-            background_video=request.background_source,
-            music_path=request.music_source,
-            platform=request.platform,
-            captions=captions if captions else None,
-            logo_path="assets/logo.png" if request.add_logo else None
+    folder, extension, content_type_prefix, max_bytes = _upload_kind(kind)
+    
+    if not content_type.startswith(content_type_prefix):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Content type must start with {content_type_prefix}"
         )
-        
-        # Upload to storage
-        storage = StorageManager()
-        download_url = storage.upload_video(output_path, user_id, video_id)
-        
-        # Update status to completed
-        # TODO: Update in database with download_url
-        
-        # Cleanup
-        engine.cleanup()
-        
-    except Exception as e:
-        # Update status to failed
-        # TODO: Update in database with error
-        print(f"Video generation failed: {e}")
-
-async def process_video_trim(
-    original_video_id: str,
-    new_video_id: str,
-    start_time: float,
-    end_time: float,
-    user_id: str
-):
-    """
-    Background task to trim video
-    """
-    pass
+    
+    file_id = str(uuid7())
+    file_path = f"uploads/{current_user['id']}/{folder}/{file_id}.{extension}"
+    
+    upload_url = await _storage.generate_presigned_put(
+        file_path,
+        content_type,
+        expiration=UPLOAD_PRESIGN_EXPIRE_SECONDS
+    )
+    
+    return {
+        "file_id": file_id,
+        "file_path": file_path,
+        "upload_url": upload_url,
+        "method": "PUT",
+        "headers": {"Content-Type": content_type},
+        "max_bytes": max_bytes,
+        "expires_in": UPLOAD_PRESIGN_EXPIRE_SECONDS
+    }
 
-async def process_platform_optimization(
-    original_video_id: str,
-    new_video_id: str,
-    target_platform: str,
-    user_id: str
+@router.post("/upload/{kind}/{file_id}/complete")
+async def complete_presigned_upload(
+    kind: str,
+    file_id: str,
+    current_user = Depends(get_current_user)
 ):
     """
-    Background task to optimize video for platform
+    Confirm a presigned upload: 404 if it never arrived, 413 (and the
+    object is deleted) if it exceeds the size limit for its kind
     """
-    pass
+    
+    folder, extension, _, max_bytes = _upload_kind(kind)
+    file_path = f"uploads/{current_user['id']}/{folder}/{file_id}.{extension}"
+    
+    size = await _storage.get_object_size(file_path)
+    if size is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    if size > max_bytes:
+        await _storage.delete_key(file_path)
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Maximum size is {max_bytes // (1024 * 1024)} MB"
+        )
+    
+    return {
+        "file_id": file_id,
+        "file_path": file_path,
+        "url": f"{_storage.cdn_url}/{file_path}",
+        "size": size
+    }
+
+async def _stream_upload(file: UploadFile, file_path: str, max_bytes: int) -> Dict[str, Any]:
+    """Stream an upload to storage part by part; 413 if it exceeds max_bytes"""
+    
+    try:
+        return await _storage.upload_stream(
+            file,
+            file_path,
+            file.content_type,
+            max_bytes=max_bytes
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Maximum size is {max_bytes // (1024 * 1024)} MB"
+        )
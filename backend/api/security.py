@@ -0,0 +1,287 @@
+"""
+🔥 VIRAL ENGINE PRO - API SECURITY
+Built: December 13, 2025 by RJ Business Solutions
+
+Single source of truth for:
+- JWT configuration and verification
+- Password hashing context
+- OAuth2 bearer scheme
+- Current-user resolution
+"""
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from jwt import api_jws, DecodeError, ExpiredSignatureError, InvalidTokenError
+from jwt.algorithms import get_default_algorithms
+from passlib.context import CryptContext
+from sqlalchemy import text
+from cachetools import TLRUCache, TTLCache
+from contextvars import ContextVar
+from typing import Optional, Tuple
+import hashlib
+import orjson
+import time
+
+from ..services.cache import (
+    USER_CACHE_TTL_SECONDS, user_cache_key, get_generic_cache, set_generic_cache
+)
+from ..services.database import get_db
+
+# OAuth2 scheme
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+
+# JWT configuration
+SECRET_KEY = "your-secret-key-change-in-production"  # TODO: Move to env
+ALGORITHM = "HS256"
+
+# Decoded JWT payload cache (keyed by SHA-256 of the token, never the raw token)
+TOKEN_CACHE_TTL_SECONDS = 30
+TOKEN_CACHE_MAXSIZE = 10_000
+
+# Structurally invalid tokens (bad segments/header/alg) rejected without decoding
+REJECTED_TOKEN_CACHE_TTL_SECONDS = 10
+REJECTED_TOKEN_CACHE_MAXSIZE = 1024
+
+# Password hashing
+BCRYPT_ROUNDS = 10
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__ident="2b"
+)
+
+# ═══════════════════════════════════════════════════════════════
+# TOKEN VERIFICATION
+# ═══════════════════════════════════════════════════════════════
+
+class JWTValidator:
+    """
+    JWT signer/verifier with key material prepared once at startup
+    
+    Uses PyJWT's JWS layer for the signature and orjson for the claims, so the
+    per-request path is signature verify + JSON parse + exp check. The same
+    object works for RS256/ES256 public keys from a JWKS.
+    """
+    
+    def __init__(self, key, algorithm: str):
+        self.algorithm = algorithm
+        self._algorithms = [algorithm]
+        self._key = get_default_algorithms()[algorithm].prepare_key(key)
+    
+    def is_well_formed(self, token: str) -> bool:
+        """
+        Cheap structural check: three segments and a parseable header whose
+        alg matches ours (also rules out alg=none downgrades)
+        """
+        if token.count(".") != 2:
+            return False
+        
+        try:
+            return api_jws.get_unverified_header(token).get("alg") == self.algorithm
+        except InvalidTokenError:
+            return False
+    
+    def sign(self, claims: dict) -> str:
+        """Serialize and sign claims"""
+        return api_jws.encode(orjson.dumps(claims), self._key, algorithm=self.algorithm)
+    
+    def verify(self, token: str) -> dict:
+        """Verify token and return its claims; raises InvalidTokenError on failure"""
+        payload = api_jws.decode(token, self._key, algorithms=self._algorithms)
+        
+        try:
+            claims = orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            raise DecodeError("Invalid payload")
+        
+        if not isinstance(claims, dict):
+            raise DecodeError("Invalid payload")
+        
+        exp = claims.get("exp")
+        if exp is not None and exp <= time.time():
+            raise ExpiredSignatureError("Signature has expired")
+        
+        return claims
+
+jwt_validator = JWTValidator(SECRET_KEY.encode(), ALGORITHM)
+
+def _token_ttu(_key: bytes, payload: dict, now: float) -> float:
+    """Expire cached payloads at the configured TTL or the token's own exp, whichever is first"""
+    return min(now + TOKEN_CACHE_TTL_SECONDS, payload.get("exp", now))
+
+_token_cache: TLRUCache = TLRUCache(maxsize=TOKEN_CACHE_MAXSIZE, ttu=_token_ttu, timer=time.time)
+
+# Negative cache for structural rejections only; signature failures are never cached
+_rejected_tokens: TTLCache = TTLCache(
+    maxsize=REJECTED_TOKEN_CACHE_MAXSIZE,
+    ttl=REJECTED_TOKEN_CACHE_TTL_SECONDS
+)
+
+# Everything any dependency or route reads off the user, in one primary-key lookup
+_USER_QUERY = text(
+    "SELECT id, email, full_name, plan AS subscription_tier, is_verified, is_suspended, "
+    "is_admin, permissions, stripe_customer_id, stripe_subscription_id, "
+    "videos_generated_this_month, storage_used_bytes "
+    "FROM users WHERE id = :id"
+)
+
+# Login lookup by email, with the stored hash; kept apart from _USER_QUERY so
+# password hashes never reach the user cache or request-scoped records
+_LOGIN_QUERY = text(
+    "SELECT id, email, password_hash, is_verified FROM users WHERE email = :email"
+)
+
+# Per-request (token, user record): the first dependency to resolve the user
+# loads it once; every later auth/permission/quota check in the same request
+# reuses it. Each request runs in its own task context, so nothing leaks.
+_request_user: ContextVar[Optional[Tuple[str, dict]]] = ContextVar("request_user", default=None)
+
+def decode_token(token: str) -> dict:
+    """
+    Decode and verify a JWT, reusing the payload of recently verified tokens.
+    
+    Only successful verifications are cached; failures always raise InvalidTokenError.
+    Malformed tokens are rejected before any signature work.
+    """
+    
+    token_hash = hashlib.sha256(token.encode()).digest()
+    
+    payload = _token_cache.get(token_hash)
+    if payload is not None:
+        return payload
+    
+    if token_hash in _rejected_tokens:
+        raise DecodeError("Malformed token")
+    
+    if not jwt_validator.is_well_formed(token):
+        _rejected_tokens[token_hash] = True
+        raise DecodeError("Malformed token")
+    
+    payload = jwt_validator.verify(token)
+    _token_cache[token_hash] = payload
+    
+    return payload
+
+# ═══════════════════════════════════════════════════════════════
+# AUTHENTICATION DEPENDENCIES
+# ═══════════════════════════════════════════════════════════════
+
+_CREDENTIALS_EXCEPTION_HEADERS = {"WWW-Authenticate": "Bearer"}
+
+def _credentials_exception() -> HTTPException:
+    """Built only on the failure path; the happy path allocates nothing"""
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers=_CREDENTIALS_EXCEPTION_HEADERS,
+    )
+
+async def load_user(db, user_id: str) -> Optional[dict]:
+    """
+    Load a user record: Redis (user:{id}, 30s) first, then a single query
+    
+    Returns None if the user does not exist.
+    """
+    key = user_cache_key(user_id)
+    
+    user = await get_generic_cache(key)
+    if user is not None:
+        return user
+    
+    result = await db.execute(_USER_QUERY, {"id": user_id})
+    row = result.mappings().first()
+    if row is None:
+        return None
+    
+    user = dict(row)
+    user["id"] = str(user["id"])
+    await set_generic_cache(key, user, USER_CACHE_TTL_SECONDS)
+    
+    return user
+
+async def load_login_user(db, email: str) -> Optional[dict]:
+    """
+    Load the record to check a login against (id, email, password_hash, is_verified)
+    
+    Always a query, never cached. Returns None if no user has that email or
+    no database is configured.
+    """
+    if db is None:
+        return None
+    
+    result = await db.execute(_LOGIN_QUERY, {"email": email})
+    row = result.mappings().first()
+    if row is None:
+        return None
+    
+    user = dict(row)
+    user["id"] = str(user["id"])
+    
+    return user
+
+async def get_user_from_token(token: str, db=None) -> dict:
+    """
+    Resolve the user for a bearer token (raises 401 if invalid)
+    
+    The returned record carries everything downstream checks need
+    (subscription tier, permissions, usage counters) and is loaded at
+    most once per request.
+    """
+    
+    cached = _request_user.get()
+    if cached is not None and cached[0] == token:
+        return cached[1]
+    
+    try:
+        payload = decode_token(token)
+        user_id: str = payload.get("sub")
+        email: str = payload.get("email")
+        
+        if user_id is None or email is None:
+            raise _credentials_exception()
+        
+        if db is None:
+            # TODO: Remove once get_db yields a real session
+            user = {
+                "id": user_id,
+                "email": email,
+                "full_name": "Test User",
+                "subscription_tier": "pro",
+                "is_verified": True,
+                "permissions": [],
+                "videos_generated_this_month": 0,
+                "storage_used_bytes": 0
+            }
+        else:
+            user = await load_user(db, user_id)
+            if user is None:
+                raise _credentials_exception()
+        
+        _request_user.set((token, user))
+        
+        return user
+        
+    except InvalidTokenError:
+        raise _credentials_exception()
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db = Depends(get_db)) -> dict:
+    """
+    Dependency to get current authenticated user from JWT token
+    """
+    return await get_user_from_token(token, db)
+
+# ═══════════════════════════════════════════════════════════════
+# WARM-UP
+# ═══════════════════════════════════════════════════════════════
+
+def warm_up():
+    """
+    Initialize the bcrypt backend and exercise the JWT sign/verify path so
+    the first login after a deploy doesn't pay the lazy-load cost
+    """
+    pwd_context.dummy_verify()
+    jwt_validator.verify(jwt_validator.sign({"sub": "warmup", "exp": int(time.time()) + 60}))
+
+warm_up()
@@ -20,6 +20,13 @@ CREATE TABLE users (
     plan VARCHAR(50) DEFAULT 'free',
     subscription_status VARCHAR(50) DEFAULT 'inactive',
     stripe_customer_id VARCHAR(255),
+    stripe_subscription_id VARCHAR(255),
+    is_verified BOOLEAN DEFAULT false,
+    is_suspended BOOLEAN DEFAULT false,
+    is_admin BOOLEAN DEFAULT false,
+    permissions TEXT[] DEFAULT '{}',
+    videos_generated_this_month INTEGER DEFAULT 0,
+    storage_used_bytes BIGINT DEFAULT 0,
     credits_remaining INTEGER DEFAULT 50,
     created_at TIMESTAMP DEFAULT NOW(),
     updated_at TIMESTAMP DEFAULT NOW(),
@@ -152,6 +159,15 @@ CREATE TABLE webhooks (
     created_at TIMESTAMP DEFAULT NOW()
 );
 
+-- ───────────────────────────────────────────────────────────
+-- PROCESSED STRIPE EVENTS (Webhook Idempotency)
+-- ───────────────────────────────────────────────────────────
+CREATE TABLE processed_stripe_events (
+    event_id VARCHAR(255) PRIMARY KEY,
+    event_type VARCHAR(100) NOT NULL,
+    processed_at TIMESTAMP DEFAULT NOW()
+);
+
 -- ───────────────────────────────────────────────────────────
 -- INDEXES
 -- ───────────────────────────────────────────────────────────
@@ -5,15 +5,21 @@ Built: December 13, 2025
 Company: RJ Business Solutions
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Header
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Header, Request, Response, File, Form, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import uvicorn
 import os
+import importlib.util
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
+from functools import lru_cache
 import asyncio
 
 # Import services
@@ -21,9 +27,24 @@ from services.video_composer import VideoComposer
 from services.storage_manager import StorageManager
 from services.trend_analyzer import TrendAnalyzer
 from services.social_poster import SocialPoster
+from services.social_integrations import run_scheduled_posts as run_scheduled_integration_posts
 from services.analytics_tracker import AnalyticsTracker
+from services.http_client import warm_http_client, close_http_client
+from services.ids import uuid7
+from services.http_cache import conditional_status_response
+from services.cache import get_redis, get_generic_cache, set_generic_cache
 from database.models import VideoJob, User, Template
-from database.connection import get_db
+from services.database import get_db
+from sqlalchemy import insert, select
+
+# Logging: records are queued by the request path and written to stderr
+# on a listener thread, so a slow log sink never blocks the event loop
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+_log_listener = QueueListener(_log_queue, _log_handler)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), handlers=[QueueHandler(_log_queue)])
+logger = logging.getLogger(__name__)
 
 # Initialize FastAPI
 app = FastAPI(
@@ -31,7 +52,8 @@ app = FastAPI(
     description="Enterprise video generation platform",
     version="1.0.0",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    default_response_class=ORJSONResponse  # orjson: faster, native datetime/UUID
 )
 
 # CORS Configuration
@@ -47,8 +69,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Compression
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+# Compression: brotli when brotli-asgi is installed (gzip for clients that
+# don't accept br), plain gzip otherwise; bodies under 1 KiB are left alone
+COMPRESSION_MINIMUM_SIZE = 1024
+
+if importlib.util.find_spec("brotli_asgi"):
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(BrotliMiddleware, quality=4, minimum_size=COMPRESSION_MINIMUM_SIZE)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE, compresslevel=5)
+
+# Analytics dashboards aggregate slow-moving data
+DASHBOARD_CACHE_TTL_SECONDS = 3600
 
 # Initialize services
 video_composer = VideoComposer()
@@ -57,6 +89,51 @@ trend_analyzer = TrendAnalyzer()
 social_poster = SocialPoster()
 analytics_tracker = AnalyticsTracker()
 
+# Per-process workers publishing scheduled posts, one per queue: URL posts
+# from SocialPoster and file posts from SocialMediaIntegrations (every
+# process runs them; each due post is still claimed exactly once)
+_scheduled_posts_workers: List[asyncio.Task] = []
+
+@app.on_event("startup")
+async def start_logging():
+    """Start writing queued log records"""
+    _log_listener.start()
+
+@app.on_event("startup")
+async def warm_connections():
+    """Pre-connect the shared HTTP client to the social platforms"""
+    await warm_http_client()
+
+@app.on_event("startup")
+async def start_scheduled_posts_worker():
+    """Start publishing scheduled posts (requires Redis)"""
+    if await get_redis() is None:
+        return
+    
+    for worker in (social_poster.run_scheduled_posts(), run_scheduled_integration_posts()):
+        task = asyncio.create_task(worker)
+        task.add_done_callback(_report_worker_exit)
+        _scheduled_posts_workers.append(task)
+
+def _report_worker_exit(task: asyncio.Task):
+    """Log a scheduled-posts worker that stopped other than by cancellation"""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Scheduled posts worker stopped", exc_info=task.exception())
+
+@app.on_event("shutdown")
+async def close_connections():
+    """Close pooled social platform connections"""
+    for task in _scheduled_posts_workers:
+        task.cancel()
+    
+    await close_http_client()
+    await social_poster.close()
+
+@app.on_event("shutdown")
+async def stop_logging():
+    """Flush queued log records"""
+    _log_listener.stop()
+
 # ===========================================
 # AUTHENTICATION
 # ===========================================
@@ -97,11 +174,6 @@ class SchedulePostRequest(BaseModel):
     caption: str
     hashtags: List[str]
 
-class StorageUploadRequest(BaseModel):
-    filename: str
-    data: str  # Base64 encoded
-    content_type: str
-
 # ===========================================
 # VIDEO GENERATION ENDPOINTS
 # ===========================================
@@ -118,7 +190,7 @@ async def generate_video(
     """
     try:
         # Create job
-        job_id = f"job_{datetime.now().timestamp()}_{os.urandom(4).hex()}"
+        job_id = f"job_{uuid7()}"
         
         # Create database record
         video_job = VideoJob(
@@ -128,7 +200,7 @@ async def generate_video(
             created_at=datetime.now()
         )
         db.add(video_job)
-        db.commit()
+        await db.commit()
         
         # Start generation in background
         background_tasks.add_task(
@@ -176,26 +248,33 @@ async def compose_video(
 @app.get("/api/video/status/{job_id}")
 async def get_video_status(
     job_id: str,
+    request: Request,
+    response: Response,
     api_key: str = Depends(verify_api_key),
     db = Depends(get_db)
 ):
     """
-    Get video generation status
+    Get video generation status (ETag / 304 when unchanged since the last poll)
     """
     try:
-        job = db.query(VideoJob).filter(VideoJob.id == job_id).first()
+        result = await db.execute(select(VideoJob).where(VideoJob.id == job_id))
+        job = result.scalar_one_or_none()
         
         if not job:
             raise HTTPException(status_code=404, detail="Job not found")
         
+        not_modified = conditional_status_response(request, response, job.status, job.progress)
+        if not_modified:
+            return not_modified
+        
         return {
             "job_id": job.id,
             "status": job.status,
             "progress": job.progress,
             "video_url": job.video_url,
             "error": job.error,
-            "created_at": job.created_at.isoformat(),
-            "completed_at": job.completed_at.isoformat() if job.completed_at else None
+            "created_at": job.created_at,
+            "completed_at": job.completed_at
         }
     except HTTPException:
         raise
@@ -206,20 +285,30 @@ async def get_video_status(
 async def bulk_generate_videos(
     request: BulkGenerationRequest,
     background_tasks: BackgroundTasks,
-    api_key: str = Depends(verify_api_key)
+    api_key: str = Depends(verify_api_key),
+    db = Depends(get_db)
 ):
     """
     Generate multiple videos in bulk
     """
     try:
-        bulk_job_id = f"bulk_{datetime.now().timestamp()}_{os.urandom(4).hex()}"
+        bulk_job_id = f"bulk_{uuid7()}"
+        job_ids = [f"{bulk_job_id}_{i}" for i in range(len(request.variations))]
+        
+        # Create all job records in one multi-row INSERT and a single commit
+        now = datetime.now()
+        await db.execute(insert(VideoJob), [
+            {
+                "id": job_id,
+                "template_id": request.template_id,
+                "status": "pending",
+                "created_at": now
+            }
+            for job_id in job_ids
+        ])
+        await db.commit()
         
-        # Create individual jobs
-        job_ids = []
-        for i, variation in enumerate(request.variations):
-            job_id = f"{bulk_job_id}_{i}"
-            job_ids.append(job_id)
-            
+        for job_id, variation in zip(job_ids, request.variations):
             # Start generation
             background_tasks.add_task(
                 process_video_generation,
@@ -247,28 +336,27 @@ async def bulk_generate_videos(
 
 @app.post("/api/storage/upload")
 async def upload_to_storage(
-    request: StorageUploadRequest,
+    file: UploadFile = File(...),
+    filename: str = Form(...),
     api_key: str = Depends(verify_api_key)
 ):
     """
     Upload file to Cloudflare R2 storage
+    
+    Multipart form upload, streamed to R2 one part at a time so memory
+    stays flat regardless of file size.
     """
     try:
-        import base64
-        
-        # Decode base64
-        file_data = base64.b64decode(request.data)
-        
-        # Upload to R2
-        url = await storage_manager.upload(
-            filename=request.filename,
-            data=file_data,
-            content_type=request.content_type
+        uploaded = await storage_manager.upload_stream(
+            file,
+            storage_manager.dated_key(filename),
+            file.content_type or "application/octet-stream"
         )
         
         return {
             "success": True,
-            "url": url
+            "url": uploaded["url"],
+            "size": uploaded["size"]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -318,7 +406,7 @@ async def analyze_trends(
         return {
             "success": True,
             "trends": trends,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": datetime.now()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -414,13 +502,18 @@ async def get_analytics_dashboard(
     api_key: str = Depends(verify_api_key)
 ):
     """
-    Get analytics dashboard data
+    Get analytics dashboard data (cached for an hour)
     """
     try:
-        data = await analytics_tracker.get_dashboard(
-            user_id=user_id,
-            date_range=date_range
-        )
+        cache_key = f"dashboard:{user_id}:{date_range}"
+        data = await get_generic_cache(cache_key)
+        
+        if data is None:
+            data = await analytics_tracker.get_dashboard(
+                user_id=user_id,
+                date_range=date_range
+            )
+            await set_generic_cache(cache_key, data, DASHBOARD_CACHE_TTL_SECONDS)
         
         return {
             "success": True,
@@ -458,15 +551,15 @@ async def track_event(
 async def optimize_video(
     video_url: str,
     platform: str,
-    quality: str = "high",
     background_tasks: BackgroundTasks,
+    quality: str = "high",
     api_key: str = Depends(verify_api_key)
 ):
     """
     Optimize video for specific platform
     """
     try:
-        job_id = f"optimize_{datetime.now().timestamp()}"
+        job_id = f"optimize_{uuid7()}"
         
         background_tasks.add_task(
             video_composer.optimize_for_platform,
@@ -502,6 +595,8 @@ async def generate_thumbnail(
             "success": True,
             "thumbnail_url": thumbnail_url
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -520,6 +615,8 @@ async def get_video_metadata(
             "success": True,
             **metadata
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -527,16 +624,21 @@ async def get_video_metadata(
 # HEALTH CHECK
 # ===========================================
 
+@lru_cache(maxsize=1)
+def _health_payload(epoch_second: int) -> Dict[str, Any]:
+    """Health response for one wall-clock second (probe floods reuse it)"""
+    return {
+        "status": "healthy",
+        "timestamp": datetime.fromtimestamp(epoch_second),
+        "version": "1.0.0"
+    }
+
 @app.get("/health")
 async def health_check():
     """
     Health check endpoint
     """
-    return {
-        "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
-        "version": "1.0.0"
-    }
+    return _health_payload(int(time.time()))
 
 @app.get("/")
 async def root():
@@ -565,11 +667,21 @@ async def process_video_generation(job_id: str, request: VideoGenerationRequest)
 # MAIN
 # ===========================================
 
+# libuv event loop and the C HTTP parser when installed (uvloop, httptools)
+UVICORN_LOOP = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+UVICORN_HTTP = "httptools" if importlib.util.find_spec("httptools") else "h11"
+
 if __name__ == "__main__":
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        workers=4
-    )
+    if os.getenv("ENV") == "dev":
+        # Reload runs a single process; never combine it with workers
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    else:
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=int(os.getenv("PORT", "8000")),
+            workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+            loop=UVICORN_LOOP,
+            http=UVICORN_HTTP,
+            access_log=False
+        )
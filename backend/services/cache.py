@@ -0,0 +1,179 @@
+"""
+Redis Cache for Viral Engine Pro
+Shared async Redis client and generic JSON read-through cache helpers
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import time
+from typing import Any, Callable, Optional
+
+import orjson
+import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Cached user records (invalidated when billing webhooks change the user)
+USER_CACHE_TTL_SECONDS = 30
+
+# Longest a stale-while-revalidate refresh may hold its lock
+REFRESH_LOCK_TTL_SECONDS = 30
+
+_redis: Optional[aioredis.Redis] = None
+_redis_lock = asyncio.Lock()
+
+# Strong references to in-flight background refreshes
+_refreshes: set = set()
+
+
+async def get_redis() -> Optional[aioredis.Redis]:
+    """
+    Get the shared Redis client (None when REDIS_URL is not configured)
+
+    Async so FastAPI awaits it directly when used as a dependency instead of
+    running it in the threadpool; the lock keeps concurrent first callers
+    from racing init.
+    """
+    global _redis
+
+    if _redis is None and REDIS_URL:
+        async with _redis_lock:
+            if _redis is None:
+                _redis = aioredis.from_url(REDIS_URL, decode_responses=True)
+
+    return _redis
+
+
+def user_cache_key(user_id: str) -> str:
+    """Redis key for a cached user record"""
+    return f"user:{user_id}"
+
+
+async def get_generic_cache(key: str) -> Optional[Any]:
+    """Read a cached JSON value (None on miss or when Redis is not configured)"""
+    redis = await get_redis()
+    if redis is None:
+        return None
+
+    cached = await redis.get(key)
+    if cached is None:
+        return None
+
+    return orjson.loads(cached)
+
+
+async def set_generic_cache(key: str, value: Any, ttl: int):
+    """Cache a JSON-serializable value for ttl seconds"""
+    redis = await get_redis()
+    if redis is None:
+        return
+
+    await redis.set(key, orjson.dumps(value), ex=ttl)
+
+
+async def delete_generic_cache(*keys: str):
+    """Invalidate cached values"""
+    redis = await get_redis()
+    if redis is None or not keys:
+        return
+
+    await redis.delete(*keys)
+
+
+def redis_cached(ttl: int, key: Callable[..., str]):
+    """
+    Decorator: read-through cache an async function's JSON result
+
+    `key` receives the same arguments as the wrapped function.
+
+    Usage:
+        @redis_cached(ttl=60, key=lambda self, platform, post_id: f"ins:{platform}:{post_id}")
+        async def get_post_analytics(self, platform, post_id):
+            ...
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            cache_key = key(*args, **kwargs)
+
+            cached = await get_generic_cache(cache_key)
+            if cached is not None:
+                return cached
+
+            result = await func(*args, **kwargs)
+            await set_generic_cache(cache_key, result, ttl)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def swr_cached(fresh_ttl: int, stale_ttl: int, key: Callable[..., str]):
+    """
+    Decorator: stale-while-revalidate cache for an async function's JSON result
+
+    Values younger than fresh_ttl are served as-is. Older ones (up to
+    stale_ttl) are still served immediately while one background task,
+    elected across workers with a SET NX lock, refreshes them. Only a cold
+    miss waits on the wrapped function. Empty results are not cached, so
+    failures are retried on the next call.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            redis = await get_redis()
+            if redis is None:
+                return await func(*args, **kwargs)
+
+            cache_key = key(*args, **kwargs)
+
+            async def refresh():
+                result = await func(*args, **kwargs)
+                if result:
+                    envelope = {"ctime": time.time(), "value": result}
+                    await redis.set(cache_key, orjson.dumps(envelope), ex=stale_ttl)
+                return result
+
+            async def refresh_in_background(lock_key: str):
+                try:
+                    await refresh()
+                except Exception:
+                    logger.exception(f"Background refresh of {cache_key} failed")
+                finally:
+                    await redis.delete(lock_key)
+
+            cached = await redis.get(cache_key)
+            if cached is None:
+                return await refresh()
+
+            envelope = orjson.loads(cached)
+            if time.time() - envelope["ctime"] >= fresh_ttl:
+                lock_key = f"lock:{cache_key}"
+                if await redis.set(lock_key, "1", nx=True, ex=REFRESH_LOCK_TTL_SECONDS):
+                    task = asyncio.create_task(refresh_in_background(lock_key))
+                    _refreshes.add(task)
+                    task.add_done_callback(_refreshes.discard)
+
+            return envelope["value"]
+
+        return wrapper
+
+    return decorator
+
+
+async def claim_once(key: str, value: str, ttl: int) -> bool:
+    """
+    Atomically claim a key (SET NX EX); False if someone already holds it
+
+    Always succeeds when Redis is not configured.
+    """
+    redis = await get_redis()
+    if redis is None:
+        return True
+
+    return bool(await redis.set(key, value, nx=True, ex=ttl))
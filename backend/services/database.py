@@ -0,0 +1,42 @@
+"""
+Database Sessions for Viral Engine Pro
+Async SQLAlchemy engine (asyncpg) and request-scoped session dependency
+"""
+
+import os
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+# Accept the plain postgresql:// URL docker-compose provides; asyncpg needs its own driver prefix
+DATABASE_URL = os.getenv("DATABASE_URL", "").replace("postgresql://", "postgresql+asyncpg://", 1)
+
+DB_POOL_SIZE = 20
+DB_MAX_OVERFLOW = 40
+
+engine: Optional[AsyncEngine] = (
+    create_async_engine(
+        DATABASE_URL,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_pre_ping=True
+    )
+    if DATABASE_URL else None
+)
+
+SessionLocal = async_sessionmaker(engine, expire_on_commit=False) if engine else None
+
+
+async def get_db():
+    """
+    Get database session (None when DATABASE_URL is not configured)
+
+    Must stay async (like every dependency in the API): sync callables
+    are offloaded to FastAPI's threadpool on every request.
+    """
+    if SessionLocal is None:
+        yield None
+        return
+
+    async with SessionLocal() as db:
+        yield db
@@ -0,0 +1,41 @@
+"""
+HTTP Caching Helpers for Viral Engine Pro
+ETag / 304 handling for status-poll endpoints
+"""
+
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+# Completed jobs never change again
+TERMINAL_STATUS_CACHE_CONTROL = "private, max-age=3600"
+
+
+def status_etag(status: str, progress: Optional[float]) -> str:
+    """ETag for a job's (status, progress) pair"""
+    digest = hashlib.blake2b(f"{status}:{progress or 0:.2f}".encode(), digest_size=8).hexdigest()
+    return f'"{digest}"'
+
+
+def conditional_status_response(
+    request: Request,
+    response: Response,
+    status: str,
+    progress: Optional[float]
+) -> Optional[Response]:
+    """
+    Tag a status response; return a bodiless 304 if the client's copy is current
+
+    Callers return the 304 as-is, skipping serialization of the payload.
+    """
+    etag = status_etag(status, progress)
+    headers = {"ETag": etag}
+    if status == "completed":
+        headers["Cache-Control"] = TERMINAL_STATUS_CACHE_CONTROL
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
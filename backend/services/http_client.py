@@ -0,0 +1,46 @@
+"""
+Shared HTTP Client for Viral Engine Pro
+One pooled httpx client for every call to the social platform APIs
+"""
+
+import asyncio
+import importlib.util
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Keeps TLS connections to graph.facebook.com / googleapis.com alive across
+# posts, and multiplexes requests over HTTP/2 when h2 is installed
+# (httpx[http2])
+http_client = httpx.AsyncClient(
+    http2=importlib.util.find_spec("h2") is not None,
+    timeout=httpx.Timeout(60.0, connect=5.0),
+    limits=httpx.Limits(max_connections=200, max_keepalive_connections=100)
+)
+
+# Hosts the integrations talk to; connections are opened at startup so the
+# first post after a worker boots skips DNS and the TLS handshake
+WARM_HOSTS = (
+    "https://graph.facebook.com/v18.0/",
+    "https://graph.instagram.com/v18.0/",
+    "https://www.googleapis.com/",
+    "https://www.tiktok.com/"
+)
+
+
+async def warm_http_client():
+    """Open pooled connections to the platform hosts (best effort)"""
+    results = await asyncio.gather(
+        *(http_client.head(url) for url in WARM_HOSTS),
+        return_exceptions=True
+    )
+    for url, result in zip(WARM_HOSTS, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Could not pre-connect to {url}: {result}")
+
+
+async def close_http_client():
+    """Close the shared HTTP client (call once, on application shutdown)"""
+    await http_client.aclose()
@@ -0,0 +1,113 @@
+"""
+Durable Job Scheduler for Viral Engine Pro
+Delayed jobs in a Redis sorted set, claimed exactly once across workers
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+import orjson
+
+from .cache import get_redis
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_POLL_SECONDS = 1.0
+SCHEDULER_BATCH_SIZE = 32
+
+# Wait after a failed poll (Redis down, timeout), doubling up to the cap
+SCHEDULER_ERROR_BACKOFF_MAX_SECONDS = 30.0
+
+
+def _payloads_key(queue: str) -> str:
+    return f"{queue}:payloads"
+
+
+async def schedule_job(queue: str, job_id: str, due_at: float, payload: Dict[str, Any]) -> bool:
+    """
+    Persist a job to run at due_at (epoch seconds)
+
+    The job id goes in a ZSET scored by due time, with the payload alongside
+    in a hash, so pending jobs survive restarts and are visible to every
+    worker. Returns False when Redis is not configured.
+    """
+    redis = await get_redis()
+    if redis is None:
+        return False
+
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.hset(_payloads_key(queue), job_id, orjson.dumps(payload))
+        pipe.zadd(queue, {job_id: due_at})
+        await pipe.execute()
+
+    return True
+
+
+async def cancel_job(queue: str, job_id: str) -> bool:
+    """Cancel a pending job (False if it was unknown or already claimed)"""
+    redis = await get_redis()
+    if redis is None:
+        return False
+
+    cancelled = await redis.zrem(queue, job_id)
+    await redis.hdel(_payloads_key(queue), job_id)
+    return bool(cancelled)
+
+
+async def run_due_jobs(queue: str, handler: Callable[[Dict[str, Any]], Awaitable[Any]]):
+    """
+    Hand jobs to handler as they come due (run one per process)
+
+    Any number of workers can run this: ZREM succeeds for exactly one of
+    them, so each due job is claimed and handled once. Jobs that came due
+    while no worker was running are picked up on the next poll.
+
+    Redis errors are logged and retried with backoff; the loop only ends
+    when its task is cancelled.
+    """
+    redis = await get_redis()
+    if redis is None:
+        raise RuntimeError("Scheduling jobs requires REDIS_URL")
+
+    running = set()
+
+    async def handle(job_id: str, payload: Dict[str, Any]):
+        try:
+            await handler(payload)
+        except Exception:
+            logger.exception(f"Scheduled job {job_id} failed")
+
+    async def poll() -> int:
+        due = await redis.zrangebyscore(queue, 0, time.time(), start=0, num=SCHEDULER_BATCH_SIZE)
+
+        for job_id in due:
+            if not await redis.zrem(queue, job_id):
+                continue  # another worker claimed it
+
+            payload = await redis.hget(_payloads_key(queue), job_id)
+            await redis.hdel(_payloads_key(queue), job_id)
+            if payload is None:
+                continue
+
+            task = asyncio.create_task(handle(job_id, orjson.loads(payload)))
+            running.add(task)
+            task.add_done_callback(running.discard)
+
+        return len(due)
+
+    backoff = SCHEDULER_POLL_SECONDS
+
+    while True:
+        try:
+            due_count = await poll()
+        except Exception:
+            logger.exception(f"Polling scheduled jobs in {queue} failed; retrying in {backoff:.0f}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, SCHEDULER_ERROR_BACKOFF_MAX_SECONDS)
+            continue
+
+        backoff = SCHEDULER_POLL_SECONDS
+        if due_count < SCHEDULER_BATCH_SIZE:
+            await asyncio.sleep(SCHEDULER_POLL_SECONDS)
@@ -10,15 +10,69 @@ Complete auto-posting to:
 
 import os
 import asyncio
+import hashlib
+import aiofiles
 import httpx
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import json
 import logging
+import random
+import time
+
+from cachetools import TTLCache
+
+from .cache import (
+    get_generic_cache, set_generic_cache, delete_generic_cache, redis_cached, claim_once
+)
+from .http_client import http_client
+from .ids import uuid7
+from .scheduler import schedule_job, cancel_job, run_due_jobs
 
 logger = logging.getLogger(__name__)
 
+# Instagram business account id per access token: in-process first, then
+# Redis (shared by all workers); keyed by a token hash, never the token
+INSTAGRAM_ACCOUNT_CACHE_TTL_SECONDS = 3600
+_instagram_account_ids: TTLCache = TTLCache(maxsize=256, ttl=INSTAGRAM_ACCOUNT_CACHE_TTL_SECONDS)
+
+# Instagram processing poll backoff (seconds): 1, 2, 4, 8, 15, 15, ...
+INSTAGRAM_POLL_INITIAL_DELAY = 1.0
+INSTAGRAM_POLL_MAX_DELAY = 15.0
+
+# Post analytics are near-real-time; a minute of staleness is fine
+POST_ANALYTICS_CACHE_TTL_SECONDS = 60
+
+# Bulk insights: concurrent Graph requests in flight, and when to switch
+# to Graph batch requests (one HTTP round trip per 50 media ids)
+INSIGHTS_CONCURRENCY = 10
+INSIGHTS_BATCH_THRESHOLD = 5
+GRAPH_BATCH_MAX_REQUESTS = 50
+INSTAGRAM_INSIGHTS_METRICS = 'plays,likes,comments,shares,saved,reach,total_interactions'
+
+# A (video, platform) pair already being posted is refused for this long,
+# so client/worker retries can't publish the same video twice
+DUPLICATE_POST_WINDOW_SECONDS = 3600
+VIDEO_FINGERPRINT_BYTES = 65536
+
+# Scheduler queue for posts of local video files
+SCHEDULED_POSTS_QUEUE = "posts:scheduled"
+
+# YouTube resumable upload chunk (must be a multiple of 256 KiB), and how
+# many times an interrupted upload is resumed before giving up
+YOUTUBE_UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024
+YOUTUBE_UPLOAD_MAX_RESUMES = 3
+
+async def _video_fingerprint(path: str) -> str:
+    """Cheap identity for a video file: blake2b of its size and first 64 KiB"""
+    async with aiofiles.open(path, 'rb') as f:
+        head = await f.read(VIDEO_FINGERPRINT_BYTES)
+    
+    digest = hashlib.blake2b(head, digest_size=16)
+    digest.update(str(os.path.getsize(path)).encode())
+    return digest.hexdigest()
+
 @dataclass
 class PostResult:
     """Result of social media post"""
@@ -49,13 +103,21 @@ class SocialMediaIntegrations:
         self,
         tiktok_session_id: Optional[str] = None,
         instagram_access_token: Optional[str] = None,
-        youtube_api_key: Optional[str] = None
+        youtube_api_key: Optional[str] = None,
+        youtube_access_token: Optional[str] = None
     ):
         self.tiktok_session_id = tiktok_session_id or os.getenv("TIKTOK_SESSION_ID")
         self.instagram_access_token = instagram_access_token or os.getenv("INSTAGRAM_ACCESS_TOKEN")
         self.youtube_api_key = youtube_api_key or os.getenv("YOUTUBE_API_KEY")
+        # Uploads need an OAuth2 access token; API keys can't authorize them
+        self.youtube_access_token = youtube_access_token or os.getenv("YOUTUBE_ACCESS_TOKEN")
+        if self.youtube_api_key and not self.youtube_access_token:
+            logger.warning(
+                "YOUTUBE_API_KEY is set but YOUTUBE_ACCESS_TOKEN is not; "
+                "YouTube posting is disabled until an OAuth2 access token is configured"
+            )
         
-        self.client = httpx.AsyncClient(timeout=60.0)
+        self.client = http_client
     
     async def post_to_all_platforms(
         self,
@@ -80,40 +142,80 @@ class SocialMediaIntegrations:
         # Format caption with hashtags
         full_caption = self._format_caption(caption, hashtags)
         
-        # Create tasks for each platform
-        tasks = []
-        
-        if 'tiktok' in platforms and self.tiktok_session_id:
-            tasks.append(self.post_to_tiktok(video_path, full_caption))
-        
-        if 'instagram' in platforms and self.instagram_access_token:
-            tasks.append(self.post_to_instagram(video_path, full_caption))
-        
-        if 'youtube' in platforms and self.youtube_api_key:
-            tasks.append(self.post_to_youtube(video_path, full_caption))
+        # Platform -> (poster, configured?)
+        posters = {
+            'tiktok': (self.post_to_tiktok, self.tiktok_session_id),
+            'instagram': (self.post_to_instagram, self.instagram_access_token),
+            'youtube': (self.post_to_youtube, self.youtube_access_token),
+        }
         
-        # Execute all posts concurrently
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        eligible = [p for p in platforms if p in posters and posters[p][1]]
+        
+        # Refuse platforms this exact video is already being/been posted to.
+        # A URL (or unreadable path) can't be fingerprinted: post without the
+        # dedupe and let each platform report its own outcome.
+        fingerprint = None
+        if eligible:
+            try:
+                fingerprint = await _video_fingerprint(video_path)
+            except OSError as e:
+                logger.warning(f"Skipping duplicate-post check for {video_path}: {e}")
+        
+        # Platform -> its dedupe claim key (None when not deduped)
+        claimed = {}
+        for platform in eligible:
+            if fingerprint is None:
+                claimed[platform] = None
+                continue
+            claim_key = f"post:{platform}:{fingerprint}"
+            if await claim_once(claim_key, "1", DUPLICATE_POST_WINDOW_SECONDS):
+                claimed[platform] = claim_key
+        
+        # Post concurrently; each task is keyed by its platform, so a skipped
+        # platform can never shift another platform's result
+        async with asyncio.TaskGroup() as tg:
+            tasks = {
+                platform: tg.create_task(
+                    self._post_safely(platform, posters[platform][0](video_path, full_caption))
+                )
+                for platform in claimed
+            }
         
-        # Build results dict
         result_dict = {}
-        platform_index = 0
-        
         for platform in platforms:
-            if platform_index < len(results):
-                result = results[platform_index]
-                if isinstance(result, Exception):
-                    result_dict[platform] = PostResult(
-                        success=False,
-                        platform=platform,
-                        error_message=str(result)
-                    )
-                else:
-                    result_dict[platform] = result
-                platform_index += 1
+            if platform in tasks:
+                result = tasks[platform].result()
+                # Failed posts give the claim back so a retry can go through
+                if not result.success and claimed[platform] is not None:
+                    await delete_generic_cache(claimed[platform])
+                result_dict[platform] = result
+            elif platform in posters and posters[platform][1]:
+                result_dict[platform] = PostResult(
+                    success=False,
+                    platform=platform,
+                    error_message="duplicate post"
+                )
+            else:
+                result_dict[platform] = PostResult(
+                    success=False,
+                    platform=platform,
+                    error_message="not configured" if platform in posters else "unsupported platform"
+                )
         
         return result_dict
     
+    async def _post_safely(self, platform: str, post) -> PostResult:
+        """Await a post, turning any exception into a failed PostResult so sibling posts keep running"""
+        try:
+            return await post
+        except Exception as e:
+            logger.error(f"{platform} posting error: {e}")
+            return PostResult(
+                success=False,
+                platform=platform,
+                error_message=str(e)
+            )
+    
     # ═══════════════════════════════════════════════════════════════
     # TIKTOK INTEGRATION
     # ═══════════════════════════════════════════════════════════════
@@ -137,20 +239,12 @@ class SocialMediaIntegrations:
             # TikTok web upload endpoint (requires session cookies)
             upload_url = "https://www.tiktok.com/api/v1/video/upload/"
             
-            # Read video file
-            with open(video_path, 'rb') as f:
-                video_data = f.read()
-            
             # Prepare upload request
             headers = {
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
                 "Cookie": f"sessionid={self.tiktok_session_id}"
             }
             
-            files = {
-                'video': ('video.mp4', video_data, 'video/mp4')
-            }
-            
             data = {
                 'caption': caption,
                 'privacy_level': privacy_level,
@@ -159,13 +253,15 @@ class SocialMediaIntegrations:
                 'comment_disabled': False
             }
             
-            # Upload video
-            response = await self.client.post(
-                upload_url,
-                headers=headers,
-                files=files,
-                data=data
-            )
+            # Upload video (httpx streams the file into the multipart body
+            # in small reads instead of loading it whole)
+            with open(video_path, 'rb') as video_file:
+                response = await self.client.post(
+                    upload_url,
+                    headers=headers,
+                    files={'video': ('video.mp4', video_file, 'video/mp4')},
+                    data=data
+                )
             
             if response.status_code == 200:
                 result = response.json()
@@ -284,8 +380,25 @@ class SocialMediaIntegrations:
             )
     
     async def _get_instagram_account_id(self) -> str:
-        """Get Instagram Business Account ID"""
-        # TODO: Cache this value
+        """Get Instagram Business Account ID (cached for an hour per token)"""
+        token_hash = hashlib.sha256(self.instagram_access_token.encode()).hexdigest()[:16]
+        
+        account_id = _instagram_account_ids.get(token_hash)
+        if account_id is not None:
+            return account_id
+        
+        cache_key = f"ig:account_id:{token_hash}"
+        account_id = await get_generic_cache(cache_key)
+        
+        if account_id is None:
+            account_id = await self._fetch_instagram_account_id()
+            await set_generic_cache(cache_key, account_id, INSTAGRAM_ACCOUNT_CACHE_TTL_SECONDS)
+        
+        _instagram_account_ids[token_hash] = account_id
+        return account_id
+    
+    async def _fetch_instagram_account_id(self) -> str:
+        """Look up the Instagram Business Account ID via the Graph API"""
         url = "https://graph.facebook.com/v18.0/me/accounts"
         params = {
             'access_token': self.instagram_access_token,
@@ -308,23 +421,30 @@ class SocialMediaIntegrations:
             'access_token': self.instagram_access_token
         }
         
-        start_time = datetime.utcnow()
-        
-        while (datetime.utcnow() - start_time).seconds < max_wait:
-            response = await self.client.get(url, params=params)
-            data = response.json()
-            
-            status = data.get('status_code')
-            
-            if status == 'FINISHED':
-                return True
-            elif status == 'ERROR':
-                raise ValueError(f"Instagram processing failed: {data.get('error_message')}")
+        async def poll():
+            delay = INSTAGRAM_POLL_INITIAL_DELAY
             
-            # Wait 5 seconds before checking again
-            await asyncio.sleep(5)
+            while True:
+                response = await self.client.get(url, params=params)
+                data = response.json()
+                
+                status = data.get('status_code')
+                
+                if status == 'FINISHED':
+                    return True
+                elif status == 'ERROR':
+                    raise ValueError(f"Instagram processing failed: {data.get('error_message')}")
+                
+                # Back off exponentially (with jitter) so quick jobs are seen
+                # quickly and slow ones don't burn API calls
+                await asyncio.sleep(delay + random.uniform(0, 0.25 * delay))
+                delay = min(delay * 2, INSTAGRAM_POLL_MAX_DELAY)
         
-        raise TimeoutError("Instagram video processing timeout")
+        # The deadline also cancels a poll request that is still in flight
+        try:
+            return await asyncio.wait_for(poll(), timeout=max_wait)
+        except asyncio.TimeoutError:
+            raise TimeoutError("Instagram video processing timeout") from None
     
     # ═══════════════════════════════════════════════════════════════
     # YOUTUBE SHORTS INTEGRATION
@@ -353,10 +473,6 @@ class SocialMediaIntegrations:
             # YouTube Data API upload endpoint
             upload_url = "https://www.googleapis.com/upload/youtube/v3/videos"
             
-            # Read video file
-            with open(video_path, 'rb') as f:
-                video_data = f.read()
-            
             # Prepare video metadata
             metadata = {
                 'snippet': {
@@ -376,25 +492,38 @@ class SocialMediaIntegrations:
                 metadata['snippet']['description'] += '\n\n#Shorts'
             
             params = {
-                'part': 'snippet,status',
-                'key': self.youtube_api_key
+                'uploadType': 'resumable',
+                'part': 'snippet,status'
             }
             
+            total_bytes = os.path.getsize(video_path)
+            
             headers = {
-                'Authorization': f'Bearer {self.youtube_api_key}',  # Use OAuth token
-                'Content-Type': 'application/octet-stream'
+                'Authorization': f'Bearer {self.youtube_access_token}',
+                'X-Upload-Content-Type': 'video/mp4',
+                'X-Upload-Content-Length': str(total_bytes)
             }
             
-            # Upload video
-            response = await self.client.post(
+            # Start a resumable upload session with the metadata
+            session_response = await self.client.post(
                 upload_url,
                 params=params,
                 headers=headers,
-                content=video_data,
                 json=metadata
             )
             
-            if response.status_code == 200:
+            if session_response.status_code != 200:
+                return PostResult(
+                    success=False,
+                    platform='youtube',
+                    error_message=f"Upload session failed: {session_response.status_code} - {session_response.text}"
+                )
+            
+            session_url = session_response.headers['Location']
+            
+            response = await self._upload_youtube_chunks(session_url, video_path, total_bytes)
+            
+            if response.status_code in (200, 201):
                 result = response.json()
                 video_id = result.get('id')
                 
@@ -420,18 +549,70 @@ class SocialMediaIntegrations:
                 error_message=str(e)
             )
     
+    async def _upload_youtube_chunks(
+        self,
+        session_url: str,
+        video_path: str,
+        total_bytes: int
+    ) -> httpx.Response:
+        """
+        Send a video to a resumable upload session in chunks
+        
+        YouTube answers 308 with the committed byte range until the last
+        chunk lands. After a dropped connection or a 5xx, the session is
+        asked how far it got and the upload resumes from there instead of
+        starting over.
+        """
+        offset = 0
+        resumes = 0
+        response = None
+        
+        async with aiofiles.open(video_path, 'rb') as f:
+            while True:
+                try:
+                    if response is None or response.status_code == 308:
+                        await f.seek(offset)
+                        chunk = await f.read(YOUTUBE_UPLOAD_CHUNK_BYTES)
+                        end = offset + len(chunk) - 1
+                        response = await self.client.put(
+                            session_url,
+                            content=chunk,
+                            headers={'Content-Range': f'bytes {offset}-{end}/{total_bytes}'}
+                        )
+                    else:
+                        # Interrupted: ask the session what it has
+                        response = await self.client.put(
+                            session_url,
+                            headers={'Content-Range': f'bytes */{total_bytes}'}
+                        )
+                except httpx.TransportError:
+                    if resumes == YOUTUBE_UPLOAD_MAX_RESUMES:
+                        raise
+                    resumes += 1
+                    response = httpx.Response(503)
+                    continue
+                
+                if response.status_code == 308:
+                    # Range: bytes=0-N (absent when nothing was committed)
+                    committed = response.headers.get('Range')
+                    offset = int(committed.rsplit('-', 1)[1]) + 1 if committed else 0
+                    continue
+                
+                if response.status_code < 500 or resumes == YOUTUBE_UPLOAD_MAX_RESUMES:
+                    return response
+                
+                resumes += 1
+    
     # ═══════════════════════════════════════════════════════════════
     # HELPER METHODS
     # ═══════════════════════════════════════════════════════════════
     
     def _format_caption(self, caption: str, hashtags: Optional[List[str]] = None) -> str:
-        """Format caption with hashtags"""
+        """Format caption with hashtags (one C-level join, no per-tag strings)"""
         if not hashtags:
             return caption
         
-        # Add hashtags at the end
-        hashtag_str = ' '.join(f'#{tag}' for tag in hashtags)
-        return f"{caption}\n\n{hashtag_str}"
+        return caption + '\n\n#' + ' #'.join(hashtags)
     
     async def _upload_to_cdn(self, video_path: str) -> str:
         """
@@ -458,16 +639,24 @@ class SocialMediaIntegrations:
             Schedule confirmation with job ID
         """
         
-        # Calculate delay
-        delay_seconds = (post_schedule.scheduled_time - datetime.utcnow()).total_seconds()
+        scheduled_time = post_schedule.scheduled_time
+        if scheduled_time.tzinfo is None:
+            scheduled_time = scheduled_time.replace(tzinfo=timezone.utc)
+        due_at = scheduled_time.timestamp()
         
-        if delay_seconds < 0:
+        if due_at < time.time():
             raise ValueError("Scheduled time must be in the future")
         
-        # Store in database with scheduled time
-        # TODO: Implement with Celery/Redis or database scheduler
+        schedule_id = f"schedule_{uuid7()}"
+        payload = {
+            'video_path': post_schedule.video_path,
+            'caption': post_schedule.caption,
+            'platforms': post_schedule.platforms,
+            'hashtags': post_schedule.hashtags
+        }
         
-        schedule_id = f"schedule_{datetime.utcnow().timestamp()}"
+        if not await schedule_job(SCHEDULED_POSTS_QUEUE, schedule_id, due_at, payload):
+            raise RuntimeError("Scheduling posts requires REDIS_URL")
         
         logger.info(f"Scheduled post {schedule_id} for {post_schedule.scheduled_time}")
         
@@ -479,11 +668,17 @@ class SocialMediaIntegrations:
         }
     
     async def cancel_scheduled_post(self, schedule_id: str) -> bool:
-        """Cancel a scheduled post"""
-        # TODO: Implement with task queue
-        logger.info(f"Cancelled scheduled post {schedule_id}")
-        return True
+        """Cancel a scheduled post (False if it was unknown or already claimed)"""
+        cancelled = await cancel_job(SCHEDULED_POSTS_QUEUE, schedule_id)
+        
+        if cancelled:
+            logger.info(f"Cancelled scheduled post {schedule_id}")
+        return cancelled
     
+    @redis_cached(
+        ttl=POST_ANALYTICS_CACHE_TTL_SECONDS,
+        key=lambda self, platform, post_id: f"ins:{platform}:{post_id}"
+    )
     async def get_post_analytics(
         self,
         platform: str,
@@ -506,13 +701,82 @@ class SocialMediaIntegrations:
         """Get Instagram Reels insights"""
         url = f"https://graph.facebook.com/v18.0/{media_id}/insights"
         params = {
-            'metric': 'plays,likes,comments,shares,saved,reach,total_interactions',
+            'metric': INSTAGRAM_INSIGHTS_METRICS,
             'access_token': self.instagram_access_token
         }
         
         response = await self.client.get(url, params=params)
+        # Graph errors (rate limit, expired token) must not be cached as insights
+        response.raise_for_status()
         return response.json()
     
+    async def get_bulk_insights(self, media_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get Instagram insights for many posts at once, keyed by media id
+        
+        Small sets fan out as individual requests; larger ones go through
+        Graph batch requests. At most INSIGHTS_CONCURRENCY requests are in
+        flight to stay inside Meta's rate limits. A failure is reported as
+        {'error': ...} for the affected ids only.
+        """
+        semaphore = asyncio.Semaphore(INSIGHTS_CONCURRENCY)
+        
+        if len(media_ids) <= INSIGHTS_BATCH_THRESHOLD:
+            async def one(media_id: str):
+                async with semaphore:
+                    return await self._get_instagram_insights(media_id)
+            
+            results = await asyncio.gather(*map(one, media_ids), return_exceptions=True)
+            return {
+                media_id: {'error': str(result)} if isinstance(result, Exception) else result
+                for media_id, result in zip(media_ids, results)
+            }
+        
+        async def batch(chunk: List[str]):
+            async with semaphore:
+                return await self._get_instagram_insights_batch(chunk)
+        
+        chunks = [
+            media_ids[i:i + GRAPH_BATCH_MAX_REQUESTS]
+            for i in range(0, len(media_ids), GRAPH_BATCH_MAX_REQUESTS)
+        ]
+        results = await asyncio.gather(*map(batch, chunks), return_exceptions=True)
+        
+        insights = {}
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, Exception):
+                insights.update((media_id, {'error': str(result)}) for media_id in chunk)
+            else:
+                insights.update(result)
+        return insights
+    
+    async def _get_instagram_insights_batch(self, media_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get insights for up to 50 media ids in one Graph batch request"""
+        batch = [
+            {'method': 'GET', 'relative_url': f"{media_id}/insights?metric={INSTAGRAM_INSIGHTS_METRICS}"}
+            for media_id in media_ids
+        ]
+        
+        response = await self.client.post(
+            "https://graph.facebook.com/v18.0/",
+            data={
+                'access_token': self.instagram_access_token,
+                'batch': json.dumps(batch)
+            }
+        )
+        response.raise_for_status()
+        
+        # One entry per request, in order; null when that request timed out
+        insights = {}
+        for media_id, item in zip(media_ids, response.json()):
+            if item is None:
+                insights[media_id] = {'error': 'Batch request timed out'}
+            elif item.get('code') != 200:
+                insights[media_id] = {'error': item.get('body') or f"HTTP {item.get('code')}"}
+            else:
+                insights[media_id] = json.loads(item.get('body') or '{}')
+        return insights
+    
     async def _get_youtube_analytics(self, video_id: str) -> Dict[str, Any]:
         """Get YouTube video analytics"""
         # TODO: Implement YouTube Analytics API
@@ -524,8 +788,30 @@ class SocialMediaIntegrations:
         return {}
     
     async def close(self):
-        """Close HTTP client"""
-        await self.client.aclose()
+        """
+        No-op: the HTTP client is shared across instances
+        
+        Use close_http_client() on application shutdown instead.
+        """
+
+
+# ═══════════════════════════════════════════════════════════════
+# SCHEDULED POST WORKER
+# ═══════════════════════════════════════════════════════════════
+
+async def run_scheduled_posts(integrations: Optional[SocialMediaIntegrations] = None):
+    """Publish scheduled posts as they come due (run one per process)"""
+    integrations = integrations or SocialMediaIntegrations()
+    
+    async def publish(post: Dict[str, Any]):
+        await integrations.post_to_all_platforms(
+            video_path=post['video_path'],
+            caption=post['caption'],
+            platforms=post['platforms'],
+            hashtags=post['hashtags']
+        )
+    
+    await run_due_jobs(SCHEDULED_POSTS_QUEUE, publish)
 
 
 # ═══════════════════════════════════════════════════════════════
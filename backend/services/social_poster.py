@@ -6,11 +6,173 @@ Company: RJ Business Solutions
 """
 
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Optional, Callable, Awaitable
 import asyncio
 import aiohttp
+import functools
+import httpx
+import random
+import ssl
+import time
 from datetime import datetime
 import json
+import logging
+import certifi
+import orjson
+from dataclasses import dataclass
+
+from .http_client import http_client
+from .ids import uuid7
+from .scheduler import schedule_job, cancel_job, run_due_jobs
+
+logger = logging.getLogger(__name__)
+
+# Scheduler queue for posts of hosted video URLs
+SCHEDULED_POSTS_QUEUE = "posts:scheduled:urls"
+
+# Connection pool shared by every post: keeps DNS answers and TLS
+# connections to the platform APIs alive between calls
+SESSION_CONNECTION_LIMIT = 100
+SESSION_CONNECTIONS_PER_HOST = 10
+DNS_CACHE_TTL_SECONDS = 300
+
+_session_lock = asyncio.Lock()
+
+# One TLS context for every platform connection: the CA bundle is parsed
+# once, and the context's session cache allows TLS resumption on reconnect
+SSL_CONTEXT = ssl.create_default_context(cafile=certifi.where())
+
+# Control-plane calls fail fast so a hung connection can't park a coroutine;
+# video transfers get longer, but still bounded
+CONTROL_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=5, sock_connect=5, sock_read=20)
+UPLOAD_TIMEOUT = aiohttp.ClientTimeout(total=600, connect=5, sock_connect=5)
+H2_CONTROL_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+H2_UPLOAD_TIMEOUT = httpx.Timeout(600.0, connect=5.0)
+
+# Download chunk size when piping a source video into an httpx upload
+UPLOAD_STREAM_CHUNK_BYTES = 64 * 1024
+
+# Static parts of the upload request bodies, built once
+TIKTOK_POST_SETTINGS = {
+    'privacy_level': 'PUBLIC_TO_EVERYONE',
+    'disable_duet': False,
+    'disable_comment': False,
+    'disable_stitch': False,
+    'video_cover_timestamp_ms': 1000
+}
+YOUTUBE_POST_STATUS = {
+    'privacyStatus': 'public',
+    'selfDeclaredMadeForKids': False
+}
+
+def _orjson_dumps(obj: Any) -> str:
+    return orjson.dumps(obj).decode()
+
+# Retries, reschedules and bulk posts repeat the same captions; keep the
+# built caption and encoded TikTok body instead of rebuilding them
+CAPTION_CACHE_SIZE = 1024
+
+@functools.lru_cache(maxsize=CAPTION_CACHE_SIZE)
+def _build_caption(caption: str, hashtags: Tuple[str, ...]) -> str:
+    """Caption followed by its hashtags"""
+    return f"{caption}\n\n{' '.join(f'#{tag}' for tag in hashtags)}"
+
+@functools.lru_cache(maxsize=CAPTION_CACHE_SIZE)
+def _tiktok_body(video_url: str, caption: str) -> bytes:
+    """Encoded TikTok upload request body"""
+    return orjson.dumps({
+        'video': {
+            'url': video_url
+        },
+        'caption': caption,
+        **TIKTOK_POST_SETTINGS
+    })
+
+# Most ids each platform accepts in one analytics request
+GRAPH_IDS_PER_REQUEST = 50
+YOUTUBE_IDS_PER_REQUEST = 50
+TIKTOK_IDS_PER_REQUEST = 20
+
+# Graph API engagement fields per platform
+GRAPH_ANALYTICS_FIELDS = {
+    'instagram': 'like_count,comments_count',
+    'facebook': 'likes.summary(true),comments.summary(true),shares'
+}
+
+# Concurrent posts in flight per platform, so a burst of due scheduled
+# posts can't open hundreds of uploads at once or trip rate limits
+PLATFORM_POST_CONCURRENCY = {
+    'tiktok': 8,
+    'youtube': 4,
+    'instagram': 6,
+    'facebook': 6
+}
+
+# Platform calls that fail to connect are retried with jittered exponential
+# backoff (nothing was sent, so a retry can't double-post)
+RETRY_ATTEMPTS = 3
+RETRY_INITIAL_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+
+# A platform failing this many calls in a row is skipped for a cool-down
+# period, after which a single trial call decides whether it's back
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_SECONDS = 60
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one platform"""
+    
+    def __init__(self):
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+    
+    def allow(self) -> bool:
+        """Whether a call may go through (closed, or half-open after the cool-down)"""
+        if self.opened_at is None:
+            return True
+        
+        if time.monotonic() - self.opened_at >= BREAKER_RESET_SECONDS:
+            self.opened_at = time.monotonic()  # one trial per cool-down
+            return True
+        
+        return False
+    
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+    
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= BREAKER_FAILURE_THRESHOLD:
+            self.opened_at = time.monotonic()
+
+@dataclass(frozen=True, slots=True)
+class PostResult:
+    """Outcome of posting to one platform"""
+    success: bool
+    platform: str
+    post_id: Optional[str] = None
+    url: Optional[str] = None
+    error: Optional[str] = None
+    
+    def as_dict(self) -> Dict[str, Any]:
+        """API shape: post_id/url on success, error on failure"""
+        if self.success:
+            return {'success': True, 'platform': self.platform, 'post_id': self.post_id, 'url': self.url}
+        return {'success': False, 'platform': self.platform, 'error': self.error}
+
+def _ok(platform: str, post_id: Optional[str], url: str) -> PostResult:
+    return PostResult(success=True, platform=platform, post_id=post_id, url=url)
+
+def _err(platform: str, error: str) -> PostResult:
+    return PostResult(success=False, platform=platform, error=error)
+
+def _stream_headers(source: aiohttp.ClientResponse, content_type: str) -> Dict[str, str]:
+    """Headers for re-sending a response body as a request body"""
+    headers = {'Content-Type': content_type}
+    if source.content_length is not None:
+        headers['Content-Length'] = str(source.content_length)
+    return headers
 
 class SocialPoster:
     def __init__(self):
@@ -18,6 +180,121 @@ class SocialPoster:
         self.youtube_api_key = os.getenv('YOUTUBE_API_KEY')
         self.instagram_access_token = os.getenv('INSTAGRAM_ACCESS_TOKEN')
         self.facebook_access_token = os.getenv('FACEBOOK_ACCESS_TOKEN')
+        self._session: aiohttp.ClientSession = None
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._post_slots: Dict[str, asyncio.Semaphore] = {
+            platform: asyncio.Semaphore(limit)
+            for platform, limit in PLATFORM_POST_CONCURRENCY.items()
+        }
+        
+        # Platform -> post(video_url, caption, hashtags, full_caption)
+        self._posters: Dict[str, Callable[..., Awaitable[PostResult]]] = {
+            'tiktok': lambda video_url, caption, hashtags, full_caption: self._post_to_tiktok(video_url, full_caption),
+            'youtube': lambda video_url, caption, hashtags, full_caption: self._post_to_youtube(video_url, caption, hashtags),
+            'instagram': lambda video_url, caption, hashtags, full_caption: self._post_to_instagram(video_url, full_caption),
+            'facebook': lambda video_url, caption, hashtags, full_caption: self._post_to_facebook(video_url, full_caption)
+        }
+        
+        # Platform -> analytics(post_id)
+        self._analytics_getters: Dict[str, Callable[[str], Awaitable[Dict[str, Any]]]] = {
+            'tiktok': self._get_tiktok_analytics,
+            'youtube': self._get_youtube_analytics,
+            'instagram': self._get_instagram_analytics,
+            'facebook': self._get_facebook_analytics
+        }
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Get the pooled HTTP session (created on first use)
+        
+        The lock keeps concurrent first callers from creating two sessions.
+        """
+        if self._session is None or self._session.closed:
+            async with _session_lock:
+                if self._session is None or self._session.closed:
+                    self._session = aiohttp.ClientSession(
+                        json_serialize=_orjson_dumps,  # json= bodies via orjson
+                        timeout=CONTROL_TIMEOUT,
+                        connector=aiohttp.TCPConnector(
+                            ssl=SSL_CONTEXT,
+                            limit=SESSION_CONNECTION_LIMIT,
+                            limit_per_host=SESSION_CONNECTIONS_PER_HOST,
+                            ttl_dns_cache=DNS_CACHE_TTL_SECONDS,
+                            enable_cleanup_closed=True
+                        )
+                    )
+        
+        return self._session
+    
+    async def _request(self, platform: str, method: str, url: str, **kwargs) -> aiohttp.ClientResponse:
+        """
+        Make a platform API call, retrying connection failures
+        
+        `data` may be a zero-argument callable building a fresh body for
+        each attempt (FormData can only be sent once). Connection failures
+        and 5xx responses count against the platform's circuit breaker.
+        Use the result as `async with await self._request(...) as response`.
+        """
+        session = await self._get_session()
+        breaker = self._breakers.setdefault(platform, CircuitBreaker())
+        data = kwargs.pop('data', None)
+        delay = RETRY_INITIAL_DELAY
+        
+        for attempt in range(1, RETRY_ATTEMPTS + 1):
+            try:
+                response = await session.request(
+                    method,
+                    url,
+                    data=data() if callable(data) else data,
+                    **kwargs
+                )
+            except aiohttp.ClientConnectorError:
+                if attempt == RETRY_ATTEMPTS:
+                    breaker.record_failure()
+                    raise
+                await asyncio.sleep(delay + random.uniform(0, delay))
+                delay = min(delay * 2, RETRY_MAX_DELAY)
+                continue
+            
+            if response.status >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            return response
+    
+    async def _request_h2(self, platform: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Make a Google/Meta API call on the shared HTTP/2 client
+        
+        Requests to the same host multiplex over one TLS connection. Retries
+        and circuit-breaker accounting match _request.
+        """
+        breaker = self._breakers.setdefault(platform, CircuitBreaker())
+        kwargs.setdefault('timeout', H2_CONTROL_TIMEOUT)
+        delay = RETRY_INITIAL_DELAY
+        
+        for attempt in range(1, RETRY_ATTEMPTS + 1):
+            try:
+                response = await http_client.request(method, url, **kwargs)
+            except httpx.ConnectError:
+                if attempt == RETRY_ATTEMPTS:
+                    breaker.record_failure()
+                    raise
+                await asyncio.sleep(delay + random.uniform(0, delay))
+                delay = min(delay * 2, RETRY_MAX_DELAY)
+                continue
+            
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            return response
+    
+    async def close(self):
+        """Close the pooled HTTP session (call on application shutdown)"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
     
     async def schedule_post(
         self,
@@ -31,28 +308,51 @@ class SocialPoster:
         Schedule post to multiple platforms
         """
         try:
-            post_id = f"post_{datetime.now().timestamp()}"
+            post_id = f"post_{uuid7()}"
             
-            # Store scheduled post in database
-            # (Implementation would use actual database)
+            # Work in POSIX seconds; naive times are taken as server-local
+            due_at = datetime.fromisoformat(scheduled_time).timestamp()
+            delay = due_at - time.time()
             
-            # Schedule background task
-            scheduled_dt = datetime.fromisoformat(scheduled_time)
-            delay = (scheduled_dt - datetime.now()).total_seconds()
+            if delay <= 0:
+                # Post immediately if time has passed
+                await self.post_immediately(video_url, platforms, caption, hashtags)
+                return post_id
             
-            if delay > 0:
+            # Persist in Redis so the post survives restarts; without Redis,
+            # fall back to an in-process timer
+            payload = {
+                'video_url': video_url,
+                'platforms': platforms,
+                'caption': caption,
+                'hashtags': hashtags
+            }
+            if not await schedule_job(SCHEDULED_POSTS_QUEUE, post_id, due_at, payload):
                 asyncio.create_task(
                     self._delayed_post(delay, post_id, video_url, platforms, caption, hashtags)
                 )
-            else:
-                # Post immediately if time has passed
-                await self.post_immediately(video_url, platforms, caption, hashtags)
             
             return post_id
-        except Exception as e:
-            print(f"Schedule post error: {str(e)}")
+        except Exception:
+            logger.exception("Schedule post error")
             raise
     
+    async def cancel_scheduled_post(self, post_id: str) -> bool:
+        """Cancel a scheduled post (False if unknown or already published)"""
+        return await cancel_job(SCHEDULED_POSTS_QUEUE, post_id)
+    
+    async def run_scheduled_posts(self):
+        """Publish scheduled posts as they come due (run one per process)"""
+        async def publish(post: Dict[str, Any]):
+            await self.post_immediately(
+                post['video_url'],
+                post['platforms'],
+                post['caption'],
+                post['hashtags']
+            )
+        
+        await run_due_jobs(SCHEDULED_POSTS_QUEUE, publish)
+    
     async def _delayed_post(
         self,
         delay: float,
@@ -73,263 +373,241 @@ class SocialPoster:
         video_url: str,
         platforms: List[str],
         caption: str,
-        hashtags: List[str]
+        hashtags: List[str],
+        on_result: Optional[Callable[[str, Dict[str, Any]], Awaitable[None]]] = None
     ) -> Dict[str, Any]:
         """
         Post video immediately to all platforms
-        """
-        results = {}
         
+        on_result, if given, is awaited with (platform, result) as each
+        platform finishes, so a fast post is reported without waiting for
+        the slowest one.
+        """
         # Build caption with hashtags
-        full_caption = f"{caption}\n\n{' '.join(f'#{tag}' for tag in hashtags)}"
+        full_caption = _build_caption(caption, tuple(hashtags))
+        
+        # Platform -> coroutine posting to it
+        posts = {
+            platform: self._posters[platform](video_url, caption, hashtags, full_caption)
+            for platform in platforms
+            if platform in self._posters
+        }
+        
+        # A single platform needs no task at all
+        if len(posts) == 1:
+            (platform, post), = posts.items()
+            results = {platform: await self._post_safely(platform, post, on_result)}
+        else:
+            async with asyncio.TaskGroup() as tg:
+                tasks = {
+                    platform: tg.create_task(self._post_safely(platform, post, on_result))
+                    for platform, post in posts.items()
+                }
+            results = {platform: task.result() for platform, task in tasks.items()}
         
-        # Post to each platform
-        tasks = []
         for platform in platforms:
-            if platform == 'tiktok':
-                tasks.append(self._post_to_tiktok(video_url, full_caption))
-            elif platform == 'youtube':
-                tasks.append(self._post_to_youtube(video_url, caption, hashtags))
-            elif platform == 'instagram':
-                tasks.append(self._post_to_instagram(video_url, full_caption))
-            elif platform == 'facebook':
-                tasks.append(self._post_to_facebook(video_url, full_caption))
-        
-        # Execute all posts
-        platform_results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Compile results
-        for i, platform in enumerate(platforms):
-            result = platform_results[i]
-            if isinstance(result, Exception):
-                results[platform] = {'success': False, 'error': str(result)}
-            else:
-                results[platform] = result
+            if platform not in results:
+                results[platform] = _err(platform, 'Unsupported platform').as_dict()
+                if on_result is not None:
+                    await on_result(platform, results[platform])
         
         return results
     
-    async def _post_to_tiktok(self, video_url: str, caption: str) -> Dict[str, Any]:
+    async def _post_safely(
+        self,
+        platform: str,
+        post,
+        on_result: Optional[Callable[[str, Dict[str, Any]], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Await a post, turning any exception into a failed result so sibling
+        posts keep running
+        
+        Waits for one of the platform's post slots, and skips the post when
+        the platform's circuit breaker is open.
+        
+        Returns the API dict shape; the posters themselves return PostResult.
+        """
+        breaker = self._breakers.setdefault(platform, CircuitBreaker())
+        
+        if not breaker.allow():
+            post.close()
+            outcome = _err(platform, 'Platform temporarily unavailable')
+        else:
+            try:
+                async with self._post_slots[platform]:
+                    outcome = await post
+            except Exception as e:
+                outcome = _err(platform, str(e))
+        
+        result = outcome.as_dict()
+        
+        if on_result is not None:
+            try:
+                await on_result(platform, result)
+            except Exception as e:
+                logger.error(f"Result callback failed for {platform}: {e}")
+        
+        return result
+    
+    async def _post_to_tiktok(self, video_url: str, caption: str) -> PostResult:
         """
         Post video to TikTok
         """
         try:
             # TikTok Content Posting API
-            async with aiohttp.ClientSession() as session:
-                # Step 1: Initialize upload
-                async with session.post(
-                    'https://open-api.tiktok.com/share/video/upload/',
-                    headers={
-                        'Authorization': f'Bearer {self.tiktok_api_key}',
-                        'Content-Type': 'application/json'
-                    },
-                    json={
-                        'video': {
-                            'url': video_url
-                        },
-                        'caption': caption,
-                        'privacy_level': 'PUBLIC_TO_EVERYONE',
-                        'disable_duet': False,
-                        'disable_comment': False,
-                        'disable_stitch': False,
-                        'video_cover_timestamp_ms': 1000
-                    }
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return {
-                            'success': True,
-                            'platform': 'tiktok',
-                            'post_id': data.get('share_id'),
-                            'url': f"https://www.tiktok.com/@user/video/{data.get('share_id')}"
-                        }
-                    else:
-                        error = await response.text()
-                        return {
-                            'success': False,
-                            'platform': 'tiktok',
-                            'error': f"Status {response.status}: {error}"
-                        }
+            # Step 1: Initialize upload
+            async with await self._request(
+                'tiktok', 'POST',
+                'https://open-api.tiktok.com/share/video/upload/',
+                headers={
+                    'Authorization': f'Bearer {self.tiktok_api_key}',
+                    'Content-Type': 'application/json'
+                },
+                data=_tiktok_body(video_url, caption)
+            ) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return _ok('tiktok', data.get('share_id'), f"https://www.tiktok.com/@user/video/{data.get('share_id')}")
+                else:
+                    error = await response.text()
+                    return _err('tiktok', f"Status {response.status}: {error}")
         except Exception as e:
-            return {
-                'success': False,
-                'platform': 'tiktok',
-                'error': str(e)
-            }
+            return _err('tiktok', str(e))
     
     async def _post_to_youtube(
         self,
         video_url: str,
         title: str,
         tags: List[str]
-    ) -> Dict[str, Any]:
+    ) -> PostResult:
         """
         Post video to YouTube Shorts
         """
         try:
-            # YouTube Data API v3
-            async with aiohttp.ClientSession() as session:
-                # Step 1: Initialize upload
-                async with session.post(
-                    'https://www.googleapis.com/upload/youtube/v3/videos?uploadType=resumable&part=snippet,status',
-                    headers={
-                        'Authorization': f'Bearer {self.youtube_api_key}',
-                        'Content-Type': 'application/json'
+            # YouTube Data API v3, over HTTP/2: the init and the upload
+            # share one connection to googleapis.com
+            session = await self._get_session()
+            # Step 1: Initialize upload
+            response = await self._request_h2(
+                'youtube', 'POST',
+                'https://www.googleapis.com/upload/youtube/v3/videos?uploadType=resumable&part=snippet,status',
+                headers={
+                    'Authorization': f'Bearer {self.youtube_api_key}',
+                    'Content-Type': 'application/json'
+                },
+                json={
+                    'snippet': {
+                        'title': title[:100],  # Max 100 chars
+                        'description': title,
+                        'tags': tags,
+                        'categoryId': '22'  # People & Blogs
                     },
-                    json={
-                        'snippet': {
-                            'title': title[:100],  # Max 100 chars
-                            'description': title,
-                            'tags': tags,
-                            'categoryId': '22'  # People & Blogs
-                        },
-                        'status': {
-                            'privacyStatus': 'public',
-                            'selfDeclaredMadeForKids': False
-                        }
-                    }
-                ) as response:
-                    if response.status == 200:
-                        upload_url = response.headers.get('Location')
-                        
-                        # Step 2: Upload video file
-                        # Download video first
-                        async with session.get(video_url) as video_response:
-                            video_data = await video_response.read()
-                        
-                        # Upload to YouTube
-                        async with session.put(
-                            upload_url,
-                            data=video_data,
-                            headers={'Content-Type': 'video/*'}
-                        ) as upload_response:
-                            if upload_response.status == 200:
-                                data = await upload_response.json()
-                                return {
-                                    'success': True,
-                                    'platform': 'youtube',
-                                    'post_id': data.get('id'),
-                                    'url': f"https://www.youtube.com/shorts/{data.get('id')}"
-                                }
-                            else:
-                                error = await upload_response.text()
-                                return {
-                                    'success': False,
-                                    'platform': 'youtube',
-                                    'error': f"Upload failed: {error}"
-                                }
-                    else:
-                        error = await response.text()
-                        return {
-                            'success': False,
-                            'platform': 'youtube',
-                            'error': f"Init failed: {error}"
-                        }
+                    'status': YOUTUBE_POST_STATUS
+                }
+            )
+            if response.status_code != 200:
+                return _err('youtube', f"Init failed: {response.text}")
+            
+            upload_url = response.headers.get('Location')
+            
+            # Step 2: Upload video file, piping the download
+            # straight into the upload body
+            async with session.get(video_url, timeout=UPLOAD_TIMEOUT) as video_response:
+                video_response.raise_for_status()
+                
+                upload_response = await self._request_h2(
+                    'youtube', 'PUT',
+                    upload_url,
+                    content=video_response.content.iter_chunked(UPLOAD_STREAM_CHUNK_BYTES),
+                    headers=_stream_headers(video_response, 'video/*'),
+                    timeout=H2_UPLOAD_TIMEOUT
+                )
+            
+            if upload_response.status_code == 200:
+                data = upload_response.json()
+                return _ok('youtube', data.get('id'), f"https://www.youtube.com/shorts/{data.get('id')}")
+            else:
+                return _err('youtube', f"Upload failed: {upload_response.text}")
         except Exception as e:
-            return {
-                'success': False,
-                'platform': 'youtube',
-                'error': str(e)
-            }
+            return _err('youtube', str(e))
     
-    async def _post_to_instagram(self, video_url: str, caption: str) -> Dict[str, Any]:
+    async def _post_to_instagram(self, video_url: str, caption: str) -> PostResult:
         """
         Post video to Instagram Reels
         """
         try:
-            # Instagram Graph API
-            async with aiohttp.ClientSession() as session:
-                # Step 1: Create media container
-                async with session.post(
-                    f'https://graph.instagram.com/v18.0/me/media',
-                    params={
-                        'video_url': video_url,
-                        'caption': caption,
-                        'media_type': 'REELS',
-                        'access_token': self.instagram_access_token
-                    }
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        container_id = data.get('id')
-                        
-                        # Step 2: Publish media
-                        async with session.post(
-                            f'https://graph.instagram.com/v18.0/me/media_publish',
-                            params={
-                                'creation_id': container_id,
-                                'access_token': self.instagram_access_token
-                            }
-                        ) as publish_response:
-                            if publish_response.status == 200:
-                                publish_data = await publish_response.json()
-                                return {
-                                    'success': True,
-                                    'platform': 'instagram',
-                                    'post_id': publish_data.get('id'),
-                                    'url': f"https://www.instagram.com/reel/{publish_data.get('id')}"
-                                }
-                            else:
-                                error = await publish_response.text()
-                                return {
-                                    'success': False,
-                                    'platform': 'instagram',
-                                    'error': f"Publish failed: {error}"
-                                }
-                    else:
-                        error = await response.text()
-                        return {
-                            'success': False,
-                            'platform': 'instagram',
-                            'error': f"Container creation failed: {error}"
-                        }
+            # Instagram Graph API, over HTTP/2
+            # Step 1: Create media container
+            response = await self._request_h2(
+                'instagram', 'POST',
+                f'https://graph.instagram.com/v18.0/me/media',
+                params={
+                    'video_url': video_url,
+                    'caption': caption,
+                    'media_type': 'REELS',
+                    'access_token': self.instagram_access_token
+                }
+            )
+            if response.status_code != 200:
+                return _err('instagram', f"Container creation failed: {response.text}")
+            
+            container_id = response.json().get('id')
+            
+            # Step 2: Publish media
+            publish_response = await self._request_h2(
+                'instagram', 'POST',
+                f'https://graph.instagram.com/v18.0/me/media_publish',
+                params={
+                    'creation_id': container_id,
+                    'access_token': self.instagram_access_token
+                }
+            )
+            if publish_response.status_code == 200:
+                publish_data = publish_response.json()
+                return _ok('instagram', publish_data.get('id'), f"https://www.instagram.com/reel/{publish_data.get('id')}")
+            else:
+                return _err('instagram', f"Publish failed: {publish_response.text}")
         except Exception as e:
-            return {
-                'success': False,
-                'platform': 'instagram',
-                'error': str(e)
-            }
+            return _err('instagram', str(e))
     
-    async def _post_to_facebook(self, video_url: str, caption: str) -> Dict[str, Any]:
+    async def _post_to_facebook(self, video_url: str, caption: str) -> PostResult:
         """
         Post video to Facebook
         """
         try:
             # Facebook Graph API
-            async with aiohttp.ClientSession() as session:
-                # Download video
-                async with session.get(video_url) as video_response:
-                    video_data = await video_response.read()
+            session = await self._get_session()
+            # Stream the download into the multipart upload
+            async with session.get(video_url, timeout=UPLOAD_TIMEOUT) as video_response:
+                video_response.raise_for_status()
+                    
+                def build_form():
+                    form = aiohttp.FormData()
+                    form.add_field('description', caption)
+                    form.add_field('access_token', self.facebook_access_token)
+                    form.add_field(
+                        'source',
+                        video_response.content,
+                        filename='video.mp4',
+                        content_type='video/mp4'
+                    )
+                    return form
                 
-                # Upload to Facebook
-                async with session.post(
-                    f'https://graph.facebook.com/v18.0/me/videos',
-                    data={
-                        'description': caption,
-                        'access_token': self.facebook_access_token
-                    },
-                    files={'source': video_data}
+                async with await self._request(
+                    'facebook', 'POST',
+                    'https://graph-video.facebook.com/v18.0/me/videos',
+                    data=build_form,
+                    timeout=UPLOAD_TIMEOUT
                 ) as response:
                     if response.status == 200:
                         data = await response.json()
-                        return {
-                            'success': True,
-                            'platform': 'facebook',
-                            'post_id': data.get('id'),
-                            'url': f"https://www.facebook.com/{data.get('id')}"
-                        }
+                        return _ok('facebook', data.get('id'), f"https://www.facebook.com/{data.get('id')}")
                     else:
                         error = await response.text()
-                        return {
-                            'success': False,
-                            'platform': 'facebook',
-                            'error': f"Upload failed: {error}"
-                        }
+                        return _err('facebook', f"Upload failed: {error}")
         except Exception as e:
-            return {
-                'success': False,
-                'platform': 'facebook',
-                'error': str(e)
-            }
+            return _err('facebook', str(e))
     
     async def get_post_analytics(
         self,
@@ -339,20 +617,145 @@ class SocialPoster:
         """
         Get analytics for posted video
         """
+        getter = self._analytics_getters.get(platform)
+        if getter is None:
+            return {'error': 'Unsupported platform'}
+        
         try:
-            if platform == 'tiktok':
-                return await self._get_tiktok_analytics(post_id)
-            elif platform == 'youtube':
-                return await self._get_youtube_analytics(post_id)
-            elif platform == 'instagram':
-                return await self._get_instagram_analytics(post_id)
-            elif platform == 'facebook':
-                return await self._get_facebook_analytics(post_id)
-            else:
-                return {'error': 'Unsupported platform'}
+            return await getter(post_id)
         except Exception as e:
             return {'error': str(e)}
     
+    async def get_post_analytics_bulk(
+        self,
+        items: List[Tuple[str, str]]
+    ) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Get analytics for many posts, as {platform: {post_id: metrics}}
+        
+        items are (platform, post_id) pairs. Ids are grouped per platform and
+        fetched in as few requests as each API allows (one per 50 ids on
+        Graph and YouTube, 20 on TikTok), all concurrently. A failed request
+        marks only its own ids with {'error': ...}.
+        """
+        fetchers = {
+            'instagram': (self._get_graph_analytics_batch, GRAPH_IDS_PER_REQUEST),
+            'facebook': (self._get_graph_analytics_batch, GRAPH_IDS_PER_REQUEST),
+            'youtube': (self._get_youtube_analytics_batch, YOUTUBE_IDS_PER_REQUEST),
+            'tiktok': (self._get_tiktok_analytics_batch, TIKTOK_IDS_PER_REQUEST)
+        }
+        
+        ids_by_platform: Dict[str, List[str]] = {}
+        for platform, post_id in items:
+            ids_by_platform.setdefault(platform, []).append(post_id)
+        
+        results: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        requests = []
+        for platform, post_ids in ids_by_platform.items():
+            if platform not in fetchers:
+                results[platform] = {post_id: {'error': 'Unsupported platform'} for post_id in post_ids}
+                continue
+            
+            fetch, per_request = fetchers[platform]
+            for i in range(0, len(post_ids), per_request):
+                requests.append((platform, post_ids[i:i + per_request], fetch))
+        
+        responses = await asyncio.gather(
+            *(fetch(platform, chunk) for platform, chunk, fetch in requests),
+            return_exceptions=True
+        )
+        
+        for (platform, chunk, _), response in zip(requests, responses):
+            metrics = results.setdefault(platform, {})
+            if isinstance(response, Exception):
+                metrics.update((post_id, {'error': str(response)}) for post_id in chunk)
+            else:
+                metrics.update(response)
+        
+        return results
+    
+    async def _get_graph_analytics_batch(self, platform: str, post_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get Instagram/Facebook engagement for up to 50 posts in one ?ids= request"""
+        token = self.instagram_access_token if platform == 'instagram' else self.facebook_access_token
+        
+        session = await self._get_session()
+        async with session.get(
+            'https://graph.facebook.com/v18.0/',
+            params={
+                'ids': ','.join(post_ids),
+                'fields': GRAPH_ANALYTICS_FIELDS[platform],
+                'access_token': token
+            }
+        ) as response:
+            response.raise_for_status()
+            data = await response.json()
+        
+        metrics = {}
+        for post_id in post_ids:
+            post = data.get(post_id, {})
+            if platform == 'instagram':
+                likes = post.get('like_count', 0)
+                comments = post.get('comments_count', 0)
+                shares = 0
+            else:
+                likes = post.get('likes', {}).get('summary', {}).get('total_count', 0)
+                comments = post.get('comments', {}).get('summary', {}).get('total_count', 0)
+                shares = post.get('shares', {}).get('count', 0)
+            
+            metrics[post_id] = {'views': 0, 'likes': likes, 'comments': comments, 'shares': shares}
+        
+        return metrics
+    
+    async def _get_youtube_analytics_batch(self, platform: str, post_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get YouTube statistics for up to 50 videos in one videos.list request"""
+        session = await self._get_session()
+        async with session.get(
+            'https://www.googleapis.com/youtube/v3/videos',
+            params={
+                'id': ','.join(post_ids),
+                'part': 'statistics',
+                'key': self.youtube_api_key
+            }
+        ) as response:
+            response.raise_for_status()
+            data = await response.json()
+        
+        statistics = {item['id']: item.get('statistics', {}) for item in data.get('items', [])}
+        
+        return {
+            post_id: {
+                'views': int(statistics.get(post_id, {}).get('viewCount', 0)),
+                'likes': int(statistics.get(post_id, {}).get('likeCount', 0)),
+                'comments': int(statistics.get(post_id, {}).get('commentCount', 0)),
+                'shares': 0
+            }
+            for post_id in post_ids
+        }
+    
+    async def _get_tiktok_analytics_batch(self, platform: str, post_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get TikTok engagement for up to 20 videos in one video query"""
+        session = await self._get_session()
+        async with session.post(
+            'https://open.tiktokapis.com/v2/video/query/',
+            params={'fields': 'id,view_count,like_count,comment_count,share_count'},
+            headers={'Authorization': f'Bearer {self.tiktok_api_key}'},
+            json={'filters': {'video_ids': post_ids}}
+        ) as response:
+            response.raise_for_status()
+            data = await response.json()
+        
+        videos = {video['id']: video for video in data.get('data', {}).get('videos', [])}
+        
+        return {
+            post_id: {
+                'views': videos.get(post_id, {}).get('view_count', 0),
+                'likes': videos.get(post_id, {}).get('like_count', 0),
+                'comments': videos.get(post_id, {}).get('comment_count', 0),
+                'shares': videos.get(post_id, {}).get('share_count', 0)
+            }
+            for post_id in post_ids
+        }
+    
     async def _get_tiktok_analytics(self, post_id: str) -> Dict[str, Any]:
         """Get TikTok video analytics"""
         # Implementation using TikTok API
@@ -7,18 +7,80 @@ Full integration with TikTok, Instagram, and YouTube APIs
 """
 
 import asyncio
-import aiohttp
-import json
+import aiofiles
 import hashlib
-import hmac
+import os
+import random
 import time
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass
+from functools import cached_property
 from enum import Enum
 import httpx
 from pathlib import Path
 
+from .http_client import close_http_client, http_client
+
+# Per-request timeouts on the shared client (its default suits API calls)
+UPLOAD_TIMEOUT = httpx.Timeout(300.0, connect=5.0)
+VIDEO_UPLOAD_TIMEOUT = httpx.Timeout(600.0, connect=5.0)
+
+# Tries per TikTok chunk PUT before giving up
+CHUNK_UPLOAD_ATTEMPTS = 3
+
+# Read size when streaming a video file into a request body; bounds the
+# memory each in-flight upload holds, whatever the chunk size
+UPLOAD_STREAM_BLOCK_BYTES = 64 * 1024
+
+# YouTube resumable upload: chunk size (a multiple of 256 KiB, as the API
+# requires) and how many interruptions to resume from before giving up
+YOUTUBE_UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024
+YOUTUBE_UPLOAD_MAX_RESUMES = 3
+
+# Instagram container polling: backoff bounds and overall deadline
+INSTAGRAM_POLL_INITIAL_DELAY = 1.0
+INSTAGRAM_POLL_MAX_DELAY = 15.0
+INSTAGRAM_PROCESSING_TIMEOUT_SECONDS = 300
+
+# Access tokens are refreshed this long before they expire
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+
+# Refreshed tokens by blake2b(refresh_token): (access_token, refresh_token,
+# expires_at epoch seconds), so every API instance holding the same refresh
+# token reuses one refresh; the per-key lock lets only one caller refresh
+_token_cache: Dict[str, Tuple[str, Optional[str], float]] = {}
+_token_locks: Dict[str, asyncio.Lock] = {}
+
+
+def _token_key(refresh_token: str) -> str:
+    return hashlib.blake2b(refresh_token.encode(), digest_size=16).hexdigest()
+
+
+async def _aiter_range(
+    path: str,
+    start: int = 0,
+    end: Optional[int] = None,
+    block: int = UPLOAD_STREAM_BLOCK_BYTES
+):
+    """
+    Yield bytes start..end (inclusive; whole file by default) of a file
+
+    Reads block by block off the event loop, so a request body streamed
+    from here never holds more than one block in memory.
+    """
+    async with aiofiles.open(path, 'rb') as f:
+        await f.seek(start)
+        remaining = None if end is None else end - start + 1
+        
+        while remaining is None or remaining > 0:
+            data = await f.read(block if remaining is None else min(block, remaining))
+            if not data:
+                break
+            if remaining is not None:
+                remaining -= len(data)
+            yield data
+
 # ═══════════════════════════════════════════════════════════════
 # PLATFORM CONFIGURATIONS
 # ═══════════════════════════════════════════════════════════════
@@ -52,6 +114,16 @@ class VideoPost:
     scheduled_time: Optional[datetime] = None
     thumbnail_path: Optional[str] = None
     category: Optional[str] = None
+    
+    @cached_property
+    def formatted_caption(self) -> str:
+        """Description plus hashtags, built once and shared by every platform"""
+        return f"{self.description}\n\n" + " ".join(f"#{tag}" for tag in self.hashtags)
+    
+    @cached_property
+    def video_size(self) -> int:
+        """Size of video_path in bytes, stat()ed once per post"""
+        return Path(self.video_path).stat().st_size
 
 # ═══════════════════════════════════════════════════════════════
 # TIKTOK API INTEGRATION
@@ -68,37 +140,74 @@ class TikTokAPI:
         self.credentials = credentials
         self.base_url = "https://open.tiktokapis.com/v2"
         self.upload_url = "https://open-upload.tiktokapis.com/video/upload"
+        self._client = http_client
         
     async def refresh_access_token(self) -> str:
         """Refresh expired access token"""
         if not self.credentials.refresh_token:
             raise ValueError("No refresh token available")
-            
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://open.tiktokapis.com/v2/oauth/token/",
-                data={
-                    "client_key": "YOUR_CLIENT_KEY",
-                    "client_secret": "YOUR_CLIENT_SECRET",
-                    "grant_type": "refresh_token",
-                    "refresh_token": self.credentials.refresh_token
-                }
+        
+        key = _token_key(self.credentials.refresh_token)
+        response = await self._client.post(
+            "https://open.tiktokapis.com/v2/oauth/token/",
+            data={
+                "client_key": "YOUR_CLIENT_KEY",
+                "client_secret": "YOUR_CLIENT_SECRET",
+                "grant_type": "refresh_token",
+                "refresh_token": self.credentials.refresh_token
+            }
+        )
+        
+        if response.status_code == 200:
+            data = response.json()
+            self.credentials.access_token = data["access_token"]
+            self.credentials.refresh_token = data.get("refresh_token")
+            self.credentials.token_expires_at = datetime.now() + timedelta(seconds=data["expires_in"])
+            _token_cache[key] = (
+                data["access_token"],
+                self.credentials.refresh_token,
+                self.credentials.token_expires_at.timestamp()
             )
+            return data["access_token"]
+        else:
+            raise Exception(f"Token refresh failed: {response.text}")
+    
+    async def _ensure_token(self) -> str:
+        """
+        Return a usable access token, refreshing it only if it's about to expire
+        
+        Concurrent callers sharing a refresh token wait on one refresh
+        instead of each hitting the token endpoint.
+        """
+        credentials = self.credentials
+        
+        def fresh(expires_at: float) -> bool:
+            return expires_at > time.time() + TOKEN_REFRESH_MARGIN_SECONDS
+        
+        if (
+            credentials.token_expires_at is None
+            or not credentials.refresh_token
+            or fresh(credentials.token_expires_at.timestamp())
+        ):
+            return credentials.access_token
+        
+        key = _token_key(credentials.refresh_token)
+        async with _token_locks.setdefault(key, asyncio.Lock()):
+            cached = _token_cache.get(key)
+            if cached and fresh(cached[2]):
+                credentials.access_token, credentials.refresh_token, expires_at = cached
+                credentials.token_expires_at = datetime.fromtimestamp(expires_at)
+                return credentials.access_token
             
-            if response.status_code == 200:
-                data = response.json()
-                self.credentials.access_token = data["access_token"]
-                self.credentials.refresh_token = data.get("refresh_token")
-                self.credentials.token_expires_at = datetime.now() + timedelta(seconds=data["expires_in"])
-                return data["access_token"]
-            else:
-                raise Exception(f"Token refresh failed: {response.text}")
+            return await self.refresh_access_token()
     
     async def initialize_upload(self, video_size: int) -> Dict[str, Any]:
         """
         Initialize video upload
         Returns upload_url and upload_id
         """
+        await self._ensure_token()
+        
         headers = {
             "Authorization": f"Bearer {self.credentials.access_token}",
             "Content-Type": "application/json"
@@ -121,53 +230,65 @@ class TikTokAPI:
             }
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/post/publish/video/init/",
-                headers=headers,
-                json=payload
-            )
-            
-            if response.status_code == 200:
-                return response.json()["data"]
-            else:
-                raise Exception(f"Upload initialization failed: {response.text}")
+        response = await self._client.post(
+            f"{self.base_url}/post/publish/video/init/",
+            headers=headers,
+            json=payload
+        )
+        
+        if response.status_code == 200:
+            return response.json()["data"]
+        else:
+            raise Exception(f"Upload initialization failed: {response.text}")
     
     async def upload_video_chunks(
         self,
         video_path: str,
         upload_url: str,
-        chunk_size: int = 10000000
+        chunk_size: int = 10000000,
+        file_size: Optional[int] = None
     ) -> bool:
-        """Upload video in chunks"""
-        file_size = Path(video_path).stat().st_size
-        
-        with open(video_path, 'rb') as video_file:
-            chunk_number = 0
+        """
+        Upload video in chunks
+
+        TikTok's media transfer takes an upload's chunks in order, one after
+        another, so they go up sequentially; each streams its byte range from
+        disk, and a chunk that fails is retried up to CHUNK_UPLOAD_ATTEMPTS
+        times before the upload is abandoned.
+        """
+        await self._ensure_token()
+        
+        if file_size is None:
+            file_size = (await asyncio.to_thread(os.stat, video_path)).st_size
+        
+        for start in range(0, file_size, chunk_size):
+            end = min(start + chunk_size, file_size) - 1
+            headers = {
+                "Authorization": f"Bearer {self.credentials.access_token}",
+                "Content-Type": "video/mp4",
+                "Content-Range": f"bytes {start}-{end}/{file_size}",
+                "Content-Length": str(end - start + 1)
+            }
             
-            while True:
-                chunk = video_file.read(chunk_size)
-                if not chunk:
-                    break
-                
-                headers = {
-                    "Authorization": f"Bearer {self.credentials.access_token}",
-                    "Content-Type": "video/mp4",
-                    "Content-Range": f"bytes {chunk_number * chunk_size}-{min((chunk_number + 1) * chunk_size, file_size) - 1}/{file_size}",
-                    "Content-Length": str(len(chunk))
-                }
-                
-                async with httpx.AsyncClient(timeout=300.0) as client:
-                    response = await client.put(
+            for attempt in range(1, CHUNK_UPLOAD_ATTEMPTS + 1):
+                try:
+                    response = await self._client.put(
                         upload_url,
                         headers=headers,
-                        content=chunk
+                        content=_aiter_range(video_path, start, end),
+                        timeout=UPLOAD_TIMEOUT
                     )
-                    
-                    if response.status_code not in [200, 201]:
+                except httpx.TransportError:
+                    if attempt == CHUNK_UPLOAD_ATTEMPTS:
+                        raise
+                else:
+                    # 206 acknowledges an intermediate chunk, 200/201 the last
+                    if response.status_code in [200, 201, 206]:
+                        break
+                    if response.status_code < 500 or attempt == CHUNK_UPLOAD_ATTEMPTS:
                         raise Exception(f"Chunk upload failed: {response.text}")
                 
-                chunk_number += 1
+                await asyncio.sleep(2 ** (attempt - 1))
         
         return True
     
@@ -179,20 +300,18 @@ class TikTokAPI:
         """
         Publish the uploaded video
         """
+        await self._ensure_token()
+        
         headers = {
             "Authorization": f"Bearer {self.credentials.access_token}",
             "Content-Type": "application/json"
         }
         
-        # Format caption with hashtags
-        caption = f"{post_config.description}\n\n"
-        caption += " ".join([f"#{tag}" for tag in post_config.hashtags])
-        
         payload = {
             "publish_id": publish_id,
             "post_info": {
                 "title": post_config.title[:150],  # Max 150 chars
-                "description": caption[:2200],  # Max 2200 chars
+                "description": post_config.formatted_caption[:2200],  # Max 2200 chars
                 "privacy_level": "PUBLIC_TO_EVERYONE" if post_config.privacy == "public" else "SELF_ONLY",
                 "disable_duet": not post_config.allow_duet,
                 "disable_comment": not post_config.allow_comments,
@@ -201,25 +320,23 @@ class TikTokAPI:
             }
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/post/publish/video/publish/",
-                headers=headers,
-                json=payload
-            )
-            
-            if response.status_code == 200:
-                return response.json()["data"]
-            else:
-                raise Exception(f"Video publish failed: {response.text}")
+        response = await self._client.post(
+            f"{self.base_url}/post/publish/video/publish/",
+            headers=headers,
+            json=payload
+        )
+        
+        if response.status_code == 200:
+            return response.json()["data"]
+        else:
+            raise Exception(f"Video publish failed: {response.text}")
     
     async def post_video(self, post_config: VideoPost) -> Dict[str, Any]:
         """
         Complete flow: Initialize -> Upload -> Publish
         """
-        # Get video file size
-        video_path = Path(post_config.video_path)
-        video_size = video_path.stat().st_size
+        # Get video file size (stat off the event loop; cached on the post)
+        video_size = await asyncio.to_thread(getattr, post_config, "video_size")
         
         # Step 1: Initialize upload
         print("🔄 Initializing TikTok upload...")
@@ -229,7 +346,7 @@ class TikTokAPI:
         
         # Step 2: Upload video chunks
         print("📤 Uploading video to TikTok...")
-        await self.upload_video_chunks(post_config.video_path, upload_url)
+        await self.upload_video_chunks(post_config.video_path, upload_url, file_size=video_size)
         
         # Step 3: Publish video
         print("🚀 Publishing video on TikTok...")
@@ -257,6 +374,7 @@ class InstagramAPI:
     def __init__(self, credentials: PlatformCredentials):
         self.credentials = credentials
         self.base_url = "https://graph.instagram.com/v18.0"
+        self._client = http_client
         
     async def create_media_container(
         self,
@@ -265,15 +383,11 @@ class InstagramAPI:
     ) -> str:
         """Create media container for video"""
         
-        # Format caption with hashtags
-        caption = f"{post_config.description}\n\n"
-        caption += " ".join([f"#{tag}" for tag in post_config.hashtags])
-        
         params = {
             "access_token": self.credentials.access_token,
             "media_type": "REELS",
             "video_url": video_url,
-            "caption": caption[:2200],  # Max 2200 chars
+            "caption": post_config.formatted_caption[:2200],  # Max 2200 chars
             "share_to_feed": True
         }
         
@@ -281,34 +395,46 @@ class InstagramAPI:
         if post_config.thumbnail_path:
             params["thumb_offset"] = 1000  # 1 second
         
-        async with httpx.AsyncClient(timeout=300.0) as client:
-            response = await client.post(
-                f"{self.base_url}/{self.credentials.account_id}/media",
-                params=params
-            )
-            
-            if response.status_code == 200:
-                return response.json()["id"]
-            else:
-                raise Exception(f"Media container creation failed: {response.text}")
+        response = await self._client.post(
+            f"{self.base_url}/{self.credentials.account_id}/media",
+            params=params,
+            timeout=UPLOAD_TIMEOUT
+        )
+        
+        if response.status_code == 200:
+            return response.json()["id"]
+        else:
+            raise Exception(f"Media container creation failed: {response.text}")
     
     async def check_container_status(self, container_id: str) -> Dict[str, Any]:
-        """Check if media container is ready"""
+        """
+        Check if media container is ready
+        
+        A Retry-After hint from the API is returned as "retry_after" (seconds).
+        """
         params = {
             "access_token": self.credentials.access_token,
             "fields": "status_code,status"
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/{container_id}",
-                params=params
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise Exception(f"Status check failed: {response.text}")
+        response = await self._client.get(
+            f"{self.base_url}/{container_id}",
+            params=params
+        )
+        
+        retry_after = response.headers.get("retry-after", "")
+        
+        if response.status_code == 200:
+            status = response.json()
+        elif response.status_code == 429 and retry_after.isdigit():
+            # Throttled: treat as still processing and wait as told
+            status = {"status_code": "IN_PROGRESS"}
+        else:
+            raise Exception(f"Status check failed: {response.text}")
+        
+        if retry_after.isdigit():
+            status["retry_after"] = float(retry_after)
+        return status
     
     async def publish_media(self, container_id: str) -> Dict[str, Any]:
         """Publish the media container"""
@@ -317,16 +443,15 @@ class InstagramAPI:
             "creation_id": container_id
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/{self.credentials.account_id}/media_publish",
-                params=params
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise Exception(f"Media publish failed: {response.text}")
+        response = await self._client.post(
+            f"{self.base_url}/{self.credentials.account_id}/media_publish",
+            params=params
+        )
+        
+        if response.status_code == 200:
+            return response.json()
+        else:
+            raise Exception(f"Media publish failed: {response.text}")
     
     async def post_video(
         self,
@@ -342,22 +467,29 @@ class InstagramAPI:
         
         # Step 2: Wait for video processing
         print("⏳ Waiting for Instagram to process video...")
-        max_attempts = 60
-        attempt = 0
         
-        while attempt < max_attempts:
-            status = await self.check_container_status(container_id)
+        async def wait_until_processed():
+            delay = INSTAGRAM_POLL_INITIAL_DELAY
             
-            if status["status_code"] == "FINISHED":
-                break
-            elif status["status_code"] == "ERROR":
-                raise Exception(f"Video processing failed: {status.get('status')}")
-            
-            await asyncio.sleep(5)
-            attempt += 1
+            while True:
+                status = await self.check_container_status(container_id)
+                
+                if status["status_code"] == "FINISHED":
+                    return
+                elif status["status_code"] == "ERROR":
+                    raise Exception(f"Video processing failed: {status.get('status')}")
+                
+                # Back off exponentially (with jitter) so short videos are
+                # published promptly and long ones don't burn API quota;
+                # a server Retry-After takes precedence
+                wait = status.get("retry_after", delay + random.uniform(0, 0.25 * delay))
+                await asyncio.sleep(wait)
+                delay = min(delay * 1.6, INSTAGRAM_POLL_MAX_DELAY)
         
-        if attempt >= max_attempts:
-            raise Exception("Video processing timeout")
+        try:
+            await asyncio.wait_for(wait_until_processed(), timeout=INSTAGRAM_PROCESSING_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            raise Exception("Video processing timeout") from None
         
         # Step 3: Publish media
         print("🚀 Publishing video on Instagram...")
@@ -385,6 +517,7 @@ class YouTubeAPI:
         self.credentials = credentials
         self.base_url = "https://www.googleapis.com/youtube/v3"
         self.upload_url = "https://www.googleapis.com/upload/youtube/v3/videos"
+        self._client = http_client
     
     async def upload_video(
         self,
@@ -394,9 +527,7 @@ class YouTubeAPI:
         """Upload video to YouTube as Short"""
         
         # Format description with hashtags
-        description = f"{post_config.description}\n\n"
-        description += " ".join([f"#{tag}" for tag in post_config.hashtags])
-        description += "\n\n#Shorts"  # Required for Shorts
+        description = post_config.formatted_caption + "\n\n#Shorts"  # Required for Shorts
         
         # Video metadata
         metadata = {
@@ -421,46 +552,36 @@ class YouTubeAPI:
             "Content-Type": "application/json"
         }
         
-        # Upload video
-        with open(video_path, 'rb') as video_file:
-            files = {
-                'video': video_file
-            }
-            
-            params = {
-                "part": "snippet,status",
-                "uploadType": "multipart"
-            }
-            
-            async with httpx.AsyncClient(timeout=600.0) as client:
-                # First, create the video resource
-                response = await client.post(
-                    self.upload_url,
-                    headers=headers,
-                    params=params,
-                    json=metadata
-                )
-                
-                if response.status_code not in [200, 201]:
-                    raise Exception(f"Video upload failed: {response.text}")
-                
-                video_data = response.json()
-                video_id = video_data["id"]
-                
-                # Upload actual video file
-                upload_response = await client.post(
-                    f"{self.upload_url}?uploadType=resumable",
-                    headers={
-                        **headers,
-                        "Content-Type": "video/*",
-                        "X-Upload-Content-Length": str(Path(video_path).stat().st_size)
-                    },
-                    params={"part": "snippet,status"},
-                    json=metadata
-                )
-                
-                if upload_response.status_code not in [200, 201]:
-                    raise Exception(f"Video file upload failed: {upload_response.text}")
+        # Start a resumable upload session with the video metadata
+        if video_path == post_config.video_path:
+            file_size = await asyncio.to_thread(getattr, post_config, "video_size")
+        else:
+            file_size = (await asyncio.to_thread(os.stat, video_path)).st_size
+        
+        response = await self._client.post(
+            self.upload_url,
+            headers={
+                **headers,
+                "X-Upload-Content-Type": "video/*",
+                "X-Upload-Content-Length": str(file_size)
+            },
+            params={"part": "snippet,status", "uploadType": "resumable"},
+            json=metadata
+        )
+        
+        if response.status_code != 200:
+            raise Exception(f"Video upload failed: {response.text}")
+        
+        upload_response = await self._upload_chunks(
+            response.headers["Location"],
+            video_path,
+            file_size
+        )
+        
+        if upload_response.status_code not in [200, 201]:
+            raise Exception(f"Video file upload failed: {upload_response.text}")
+        
+        video_id = upload_response.json()["id"]
         
         return {
             "platform": "youtube",
@@ -469,6 +590,63 @@ class YouTubeAPI:
             "share_url": f"https://youtube.com/shorts/{video_id}",
             "published_at": datetime.now().isoformat()
         }
+    
+    async def _upload_chunks(
+        self,
+        session_url: str,
+        video_path: str,
+        file_size: int
+    ) -> httpx.Response:
+        """
+        Send a video to a resumable upload session in chunks
+        
+        YouTube only accepts a session's chunks in order, answering 308 with
+        the committed byte range until the last one lands. After a dropped
+        connection or a 5xx, the session is asked how far it got and the
+        upload resumes from there instead of starting over.
+        """
+        auth = {"Authorization": f"Bearer {self.credentials.access_token}"}
+        offset = 0
+        resumes = 0
+        response = None
+        
+        while True:
+            try:
+                if response is None or response.status_code == 308:
+                    end = min(offset + YOUTUBE_UPLOAD_CHUNK_BYTES, file_size) - 1
+                    response = await self._client.put(
+                        session_url,
+                        headers={
+                            **auth,
+                            "Content-Length": str(end - offset + 1),
+                            "Content-Range": f"bytes {offset}-{end}/{file_size}"
+                        },
+                        content=_aiter_range(video_path, offset, end),
+                        timeout=VIDEO_UPLOAD_TIMEOUT
+                    )
+                else:
+                    # Interrupted: ask the session what it has
+                    response = await self._client.put(
+                        session_url,
+                        headers={**auth, "Content-Range": f"bytes */{file_size}"}
+                    )
+            except httpx.TransportError:
+                if resumes == YOUTUBE_UPLOAD_MAX_RESUMES:
+                    raise
+                resumes += 1
+                response = httpx.Response(503)
+                continue
+            
+            if response.status_code == 308:
+                # Range: bytes=0-N (absent when nothing was committed)
+                committed = response.headers.get("Range")
+                offset = int(committed.rsplit("-", 1)[1]) + 1 if committed else 0
+                continue
+            
+            if response.status_code < 500 or resumes == YOUTUBE_UPLOAD_MAX_RESUMES:
+                return response
+            
+            resumes += 1
 
 # ═══════════════════════════════════════════════════════════════
 # UNIFIED SOCIAL POSTER
@@ -502,57 +680,57 @@ class SocialMediaPoster:
         post_config: VideoPost,
         video_url: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Post to a single platform"""
+        """Post to a single platform (errors are raised, not returned)"""
         if platform not in self.platforms:
             raise ValueError(f"Platform {platform.value} not configured")
         
         api = self.platforms[platform]
         
-        try:
-            if platform == Platform.INSTAGRAM:
-                # Instagram requires public video URL
-                if not video_url:
-                    raise ValueError("Instagram requires video_url parameter")
-                result = await api.post_video(post_config, video_url)
-            else:
-                # TikTok and YouTube upload from local file
-                result = await api.post_video(post_config)
-            
-            return result
-        except Exception as e:
-            return {
-                "platform": platform.value,
-                "success": False,
-                "error": str(e),
-                "attempted_at": datetime.now().isoformat()
-            }
+        if platform == Platform.INSTAGRAM:
+            # Instagram requires public video URL
+            if not video_url:
+                raise ValueError("Instagram requires video_url parameter")
+            return await api.post_video(post_config, video_url)
+        
+        # TikTok and YouTube upload from local file
+        return await api.post_video(post_config)
     
     async def post_to_all_platforms(
         self,
         post_config: VideoPost,
         video_url: Optional[str] = None,
-        platforms: Optional[List[Platform]] = None
+        platforms: Optional[List[Platform]] = None,
+        fail_fast: bool = False
     ) -> List[Dict[str, Any]]:
         """
         Post to multiple platforms simultaneously
+        
+        By default a platform that fails gets an error result and the others
+        carry on. With fail_fast, the first failure cancels the posts still
+        in flight (e.g. an Instagram processing poll) and is raised in an
+        ExceptionGroup.
         """
         if platforms is None:
             platforms = list(self.platforms.keys())
         
-        tasks = [
-            self.post_to_platform(platform, post_config, video_url)
-            for platform in platforms
-        ]
+        async def post(platform: Platform) -> Dict[str, Any]:
+            if fail_fast:
+                return await self.post_to_platform(platform, post_config, video_url)
+            
+            try:
+                return await self.post_to_platform(platform, post_config, video_url)
+            except Exception as e:
+                return {
+                    "platform": platform.value,
+                    "success": False,
+                    "error": str(e),
+                    "attempted_at": datetime.now().isoformat()
+                }
         
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(post(platform)) for platform in platforms]
         
-        return [
-            result if not isinstance(result, Exception) else {
-                "success": False,
-                "error": str(result)
-            }
-            for result in results
-        ]
+        return [task.result() for task in tasks]
     
     async def schedule_post(
         self,
@@ -644,5 +822,7 @@ async def example_usage():
         else:
             print(f"❌ {result['platform']}: {result['error']}")
 
+    await close_http_client()
+
 if __name__ == "__main__":
     asyncio.run(example_usage())
@@ -5,6 +5,7 @@ Built: December 13, 2025
 Company: RJ Business Solutions
 """
 
+import asyncio
 import boto3
 from botocore.client import Config
 import os
@@ -13,6 +14,14 @@ from typing import Optional, List, Dict, Any
 import mimetypes
 from datetime import datetime
 
+from .cache import get_generic_cache, set_generic_cache
+
+# Background clip listings change only when clips are added to the bucket
+BACKGROUND_CLIPS_CACHE_TTL_SECONDS = 300
+
+# Multipart part size for streamed uploads (S3/R2 minimum is 5 MiB)
+MULTIPART_CHUNK_BYTES = 8 * 1024 * 1024
+
 class StorageManager:
     def __init__(self):
         # Initialize Cloudflare R2 client (S3-compatible)
@@ -28,6 +37,11 @@ class StorageManager:
         self.bucket_name = os.getenv('CLOUDFLARE_R2_BUCKET_NAME', 'viral-engine-pro')
         self.cdn_url = os.getenv('CLOUDFLARE_CDN_URL', 'https://cdn.viral-engine-pro.com')
     
+    def dated_key(self, filename: str, folder: str = 'uploads') -> str:
+        """Object key for a new upload: folder/YYYY/MM/DD/filename"""
+        timestamp = datetime.now().strftime('%Y/%m/%d')
+        return f"{folder}/{timestamp}/{filename}"
+    
     async def upload(
         self,
         filename: str,
@@ -40,11 +54,11 @@ class StorageManager:
         """
         try:
             # Generate unique key
-            timestamp = datetime.now().strftime('%Y/%m/%d')
-            key = f"{folder}/{timestamp}/{filename}"
+            key = self.dated_key(filename, folder)
             
-            # Upload to R2
-            self.s3_client.put_object(
+            # Upload to R2 (boto3 is blocking; keep it off the event loop)
+            await asyncio.to_thread(
+                self.s3_client.put_object,
                 Bucket=self.bucket_name,
                 Key=key,
                 Body=data,
@@ -61,18 +75,125 @@ class StorageManager:
             print(f"Upload error: {str(e)}")
             raise
     
+    async def upload_path(
+        self,
+        file_path: Path,
+        filename: str,
+        content_type: str,
+        folder: str = 'uploads'
+    ) -> str:
+        """
+        Upload a local file to Cloudflare R2
+        
+        boto3's managed transfer streams from disk (multipart for large
+        files) in a worker thread, so neither the file nor the upload is
+        ever held on the event loop.
+        """
+        key = self.dated_key(filename, folder)
+        
+        await asyncio.to_thread(
+            self.s3_client.upload_file,
+            str(file_path),
+            self.bucket_name,
+            key,
+            ExtraArgs={
+                'ContentType': content_type,
+                'CacheControl': 'max-age=31536000',  # 1 year cache
+                'Metadata': {
+                    'uploaded_at': datetime.now().isoformat()
+                }
+            }
+        )
+        
+        return f"{self.cdn_url}/{key}"
+    
+    async def upload_stream(
+        self,
+        stream,
+        key: str,
+        content_type: str,
+        max_bytes: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Stream an async file-like object (e.g. UploadFile) to R2 via multipart
+
+        Reads one part at a time, so memory stays at MULTIPART_CHUNK_BYTES
+        regardless of upload size. Aborts the multipart upload on failure.
+        Bodies that fit in one part (including empty ones) go up with a
+        single put_object, since a multipart upload needs at least one part.
+        """
+        first = await stream.read(MULTIPART_CHUNK_BYTES)
+        if max_bytes is not None and len(first) > max_bytes:
+            raise ValueError(f"Upload exceeds {max_bytes} bytes")
+        
+        if len(first) < MULTIPART_CHUNK_BYTES:
+            await asyncio.to_thread(
+                self.s3_client.put_object,
+                Bucket=self.bucket_name,
+                Key=key,
+                Body=first,
+                ContentType=content_type,
+                CacheControl='max-age=31536000'
+            )
+            return {"url": f"{self.cdn_url}/{key}", "size": len(first)}
+        
+        upload = await asyncio.to_thread(
+            self.s3_client.create_multipart_upload,
+            Bucket=self.bucket_name,
+            Key=key,
+            ContentType=content_type,
+            CacheControl='max-age=31536000'
+        )
+        upload_id = upload['UploadId']
+        parts = []
+        size = 0
+        
+        try:
+            chunk = first
+            while chunk:
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise ValueError(f"Upload exceeds {max_bytes} bytes")
+                
+                part_number = len(parts) + 1
+                part = await asyncio.to_thread(
+                    self.s3_client.upload_part,
+                    Bucket=self.bucket_name,
+                    Key=key,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=chunk
+                )
+                parts.append({'ETag': part['ETag'], 'PartNumber': part_number})
+                chunk = await stream.read(MULTIPART_CHUNK_BYTES)
+            
+            await asyncio.to_thread(
+                self.s3_client.complete_multipart_upload,
+                Bucket=self.bucket_name,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+        except Exception:
+            await asyncio.to_thread(
+                self.s3_client.abort_multipart_upload,
+                Bucket=self.bucket_name,
+                Key=key,
+                UploadId=upload_id
+            )
+            raise
+        
+        return {"url": f"{self.cdn_url}/{key}", "size": size}
+    
     async def upload_video(self, file_path: Path, job_id: str) -> str:
         """
         Upload video file
         """
         try:
-            with open(file_path, 'rb') as f:
-                data = f.read()
-            
             filename = f"{job_id}_{file_path.name}"
             content_type = mimetypes.guess_type(str(file_path))[0] or 'video/mp4'
             
-            return await self.upload(filename, data, content_type, folder='videos')
+            return await self.upload_path(file_path, filename, content_type, folder='videos')
         except Exception as e:
             print(f"Video upload error: {str(e)}")
             raise
@@ -82,13 +203,10 @@ class StorageManager:
         Upload image file
         """
         try:
-            with open(file_path, 'rb') as f:
-                data = f.read()
-            
             filename = f"{job_id}_{file_path.name}"
             content_type = mimetypes.guess_type(str(file_path))[0] or 'image/jpeg'
             
-            return await self.upload(filename, data, content_type, folder='images')
+            return await self.upload_path(file_path, filename, content_type, folder='images')
         except Exception as e:
             print(f"Image upload error: {str(e)}")
             raise
@@ -98,13 +216,10 @@ class StorageManager:
         Upload audio file
         """
         try:
-            with open(file_path, 'rb') as f:
-                data = f.read()
-            
             filename = f"{job_id}_{file_path.name}"
             content_type = mimetypes.guess_type(str(file_path))[0] or 'audio/mpeg'
             
-            return await self.upload(filename, data, content_type, folder='audio')
+            return await self.upload_path(file_path, filename, content_type, folder='audio')
         except Exception as e:
             print(f"Audio upload error: {str(e)}")
             raise
@@ -116,8 +231,13 @@ class StorageManager:
         min_duration: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
-        Get available background video clips
+        Get available background video clips (cached for 5 minutes)
         """
+        cache_key = f"bg_clips:{clip_type}:{subtype or ''}:{min_duration or 0}"
+        cached = await get_generic_cache(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             # List objects with prefix
             prefix = f"backgrounds/{clip_type}/"
@@ -152,6 +272,7 @@ class StorageManager:
                         'subtype': subtype
                     })
             
+            await set_generic_cache(cache_key, clips, BACKGROUND_CLIPS_CACHE_TTL_SECONDS)
             return clips
         except Exception as e:
             print(f"Get background clips error: {str(e)}")
@@ -219,6 +340,53 @@ class StorageManager:
             print(f"Presigned URL error: {str(e)}")
             raise
     
+    async def generate_presigned_put(
+        self,
+        key: str,
+        content_type: str,
+        expiration: int = 3600
+    ) -> str:
+        """
+        Generate a presigned PUT so the client uploads straight to R2
+        
+        R2 has no POST Object (form uploads), so the size can't be capped in
+        the signature; check it with get_object_size once the upload is done.
+        """
+        try:
+            return self.s3_client.generate_presigned_url(
+                'put_object',
+                Params={
+                    'Bucket': self.bucket_name,
+                    'Key': key,
+                    'ContentType': content_type
+                },
+                ExpiresIn=expiration
+            )
+        except Exception as e:
+            print(f"Presigned PUT error: {str(e)}")
+            raise
+    
+    async def get_object_size(self, key: str) -> Optional[int]:
+        """Size in bytes of an uploaded object (None if it doesn't exist)"""
+        try:
+            response = await asyncio.to_thread(
+                self.s3_client.head_object,
+                Bucket=self.bucket_name,
+                Key=key
+            )
+        except self.s3_client.exceptions.ClientError:
+            return None
+        
+        return response['ContentLength']
+    
+    async def delete_key(self, key: str):
+        """Delete an object by key"""
+        await asyncio.to_thread(
+            self.s3_client.delete_object,
+            Bucket=self.bucket_name,
+            Key=key
+        )
+    
     async def copy_file(self, source_url: str, destination_key: str) -> str:
         """
         Copy file within R2
@@ -4,13 +4,31 @@ Handles subscriptions, one-time payments, webhooks
 """
 
 import stripe
+import asyncio
+import functools
+import orjson
 import os
+import re
+import time
 from typing import Dict, Optional
 from datetime import datetime, timedelta
 from fastapi import HTTPException
+from sqlalchemy import text
 
-# Initialize Stripe
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY", "sk_test_...")
+from .cache import delete_generic_cache, user_cache_key
+
+# Initialize Stripe. Secrets are bound once at import; a missing one fails
+# the process at startup rather than the first billing request.
+def _require_env(*names: str) -> str:
+    """First non-empty value among the given environment variables"""
+    for name in names:
+        value = os.environ.get(name)
+        if value:
+            return value
+    raise RuntimeError(f"{names[0]} must be set")
+
+
+stripe.api_key = _require_env("STRIPE_SECRET_KEY")
 
 # Subscription Price IDs (replace with your actual Stripe Price IDs)
 STRIPE_PRICES = {
@@ -22,21 +40,128 @@ STRIPE_PRICES = {
     "enterprise_annual": "price_enterprise_annual_xxx",
 }
 
-# Webhook Secret
-STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "whsec_...")
+# Webhook Secrets. Comma-separated so a rotated secret can be added before
+# the old one is removed; each is tried in turn. STRIPE_WEBHOOK_SECRET (single)
+# is still accepted for existing deployments.
+STRIPE_WEBHOOK_SECRETS = tuple(
+    secret.strip()
+    for secret in _require_env("STRIPE_WEBHOOK_SECRETS", "STRIPE_WEBHOOK_SECRET").split(",")
+    if secret.strip()
+)
+WEBHOOK_TOLERANCE_SECONDS = 300
+
+# Read-through cache of subscription lookups (invalidated on writes/webhooks)
+SUBSCRIPTION_CACHE_TTL_SECONDS = 300
+
+
+def subscription_cache_key(subscription_id: str) -> str:
+    """Redis key for a cached subscription lookup"""
+    return f"stripe_sub:{subscription_id}"
+
+
+# Responses to create calls, replayed for retries with the same Idempotency-Key
+# (matches how long Stripe itself remembers a key)
+IDEMPOTENT_RESPONSE_TTL_SECONDS = 24 * 60 * 60
+
+
+def idempotent_response_cache_key(user_id: str, idempotency_key: str) -> str:
+    """Redis key for a cached create-call response"""
+    return f"idempotency:{user_id}:{idempotency_key}"
+
+
+# Outbound pacing: stay under Stripe's ~100 req/s limit by delaying calls.
+# The limit is per account and the bucket per process, so each API worker
+# (WEB_CONCURRENCY of them, as main.py starts) gets an equal share.
+STRIPE_REQUESTS_PER_SECOND = 80
+STRIPE_WORKER_PROCESSES = max(1, int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+STRIPE_REQUESTS_PER_SECOND_PER_PROCESS = STRIPE_REQUESTS_PER_SECOND / STRIPE_WORKER_PROCESSES
+STRIPE_RATE_LIMITED_BACKOFF_SECONDS = 1.0
+
+
+class LeakyBucket:
+    """
+    Pace calls to at most `rate` per `per` seconds
+
+    Callers are delayed rather than rejected; the lock is held while
+    sleeping so waiters leave in arrival order, one interval apart.
+    """
+
+    def __init__(self, rate: float, per: float = 1.0):
+        self.interval = per / rate
+        self._next_available = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            if now < self._next_available:
+                await asyncio.sleep(self._next_available - now)
+                now = self._next_available
+            self._next_available = now + self.interval
+
+    def defer(self, seconds: float):
+        """Hold back every later call for at least `seconds` (e.g. after a 429)"""
+        self._next_available = max(self._next_available, time.monotonic() + seconds)
+
+
+def leaky_bucket(rate: float, per: float = 1.0):
+    """Decorator: pace an async function through a shared LeakyBucket"""
+    bucket = LeakyBucket(rate, per)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            await bucket.wait()
+            return await func(*args, **kwargs)
+
+        wrapper.bucket = bucket
+        return wrapper
+
+    return decorator
+
+
+@leaky_bucket(rate=STRIPE_REQUESTS_PER_SECOND_PER_PROCESS, per=1.0)
+async def _stripe_request(func, *args, **kwargs):
+    """
+    Run one blocking Stripe SDK call in a thread, paced by the leaky bucket
+
+    A 429 from Stripe pushes the bucket back so the calls queued behind
+    this one stop hammering the API too.
+    """
+    try:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    except stripe.error.RateLimitError as e:
+        retry_after = (e.headers or {}).get("Retry-After")
+        _stripe_request.bucket.defer(
+            float(retry_after) if retry_after else STRIPE_RATE_LIMITED_BACKOFF_SECONDS
+        )
+        raise
 
 
 class StripeService:
-    """Handle all Stripe payment operations"""
+    """
+    Handle all Stripe payment operations
+
+    The stripe SDK is synchronous; every API call runs via _stripe_request,
+    which paces it through the outbound leaky bucket and then runs it in a
+    thread so a Stripe round-trip never blocks the event loop.
+    """
 
     @staticmethod
-    async def create_customer(email: str, name: str, metadata: Dict = None) -> Dict:
+    async def create_customer(
+        email: str,
+        name: str,
+        metadata: Dict = None,
+        idempotency_key: Optional[str] = None
+    ) -> Dict:
         """Create a Stripe customer"""
         try:
-            customer = stripe.Customer.create(
+            customer = await _stripe_request(
+                stripe.Customer.create,
                 email=email,
                 name=name,
-                metadata=metadata or {}
+                metadata=metadata or {},
+                idempotency_key=idempotency_key
             )
             return {
                 "customer_id": customer.id,
@@ -52,11 +177,13 @@ class StripeService:
         price_id: str,
         success_url: str,
         cancel_url: str,
-        metadata: Dict = None
+        metadata: Dict = None,
+        idempotency_key: Optional[str] = None
     ) -> Dict:
         """Create a Stripe Checkout session for subscription"""
         try:
-            session = stripe.checkout.Session.create(
+            session = await _stripe_request(
+                stripe.checkout.Session.create,
                 customer=customer_id,
                 payment_method_types=["card"],
                 line_items=[{
@@ -67,8 +194,10 @@ class StripeService:
                 success_url=success_url,
                 cancel_url=cancel_url,
                 metadata=metadata or {},
+                subscription_data={"metadata": metadata or {}},  # lets subscription webhooks find the user
                 allow_promotion_codes=True,
                 billing_address_collection="required",
+                idempotency_key=idempotency_key,
             )
             return {
                 "session_id": session.id,
@@ -82,7 +211,8 @@ class StripeService:
     async def create_subscription(
         customer_id: str,
         price_id: str,
-        trial_days: Optional[int] = None
+        trial_days: Optional[int] = None,
+        idempotency_key: Optional[str] = None
     ) -> Dict:
         """Create a subscription directly (without Checkout)"""
         try:
@@ -96,7 +226,11 @@ class StripeService:
             if trial_days:
                 subscription_params["trial_period_days"] = trial_days
 
-            subscription = stripe.Subscription.create(**subscription_params)
+            subscription = await _stripe_request(
+                stripe.Subscription.create,
+                idempotency_key=idempotency_key,
+                **subscription_params
+            )
             
             return {
                 "subscription_id": subscription.id,
@@ -112,12 +246,13 @@ class StripeService:
         """Cancel a subscription"""
         try:
             if at_period_end:
-                subscription = stripe.Subscription.modify(
+                subscription = await _stripe_request(
+                    stripe.Subscription.modify,
                     subscription_id,
                     cancel_at_period_end=True
                 )
             else:
-                subscription = stripe.Subscription.delete(subscription_id)
+                subscription = await _stripe_request(stripe.Subscription.delete, subscription_id)
             
             return {
                 "subscription_id": subscription.id,
@@ -132,9 +267,10 @@ class StripeService:
     async def update_subscription(subscription_id: str, new_price_id: str) -> Dict:
         """Upgrade/downgrade subscription"""
         try:
-            subscription = stripe.Subscription.retrieve(subscription_id)
+            subscription = await _stripe_request(stripe.Subscription.retrieve, subscription_id)
             
-            updated_subscription = stripe.Subscription.modify(
+            updated_subscription = await _stripe_request(
+                stripe.Subscription.modify,
                 subscription_id,
                 items=[{
                     "id": subscription["items"]["data"][0].id,
@@ -155,7 +291,7 @@ class StripeService:
     async def get_subscription(subscription_id: str) -> Dict:
         """Get subscription details"""
         try:
-            subscription = stripe.Subscription.retrieve(subscription_id)
+            subscription = await _stripe_request(stripe.Subscription.retrieve, subscription_id)
             return {
                 "subscription_id": subscription.id,
                 "status": subscription.status,
@@ -171,7 +307,8 @@ class StripeService:
     async def create_portal_session(customer_id: str, return_url: str) -> Dict:
         """Create Stripe Customer Portal session for managing subscriptions"""
         try:
-            session = stripe.billing_portal.Session.create(
+            session = await _stripe_request(
+                stripe.billing_portal.Session.create,
                 customer=customer_id,
                 return_url=return_url,
             )
@@ -182,45 +319,128 @@ class StripeService:
             raise HTTPException(status_code=400, detail=str(e))
 
     @staticmethod
-    async def handle_webhook(payload: bytes, sig_header: str) -> Dict:
-        """Handle Stripe webhook events"""
+    def construct_event(payload: bytes, sig_header: str) -> stripe.Event:
+        """Verify the webhook signature against each configured secret, then parse once"""
         try:
-            event = stripe.Webhook.construct_event(
-                payload, sig_header, STRIPE_WEBHOOK_SECRET
-            )
-        except ValueError:
+            signed_payload = payload.decode("utf-8")
+        except UnicodeDecodeError:
             raise HTTPException(status_code=400, detail="Invalid payload")
-        except stripe.error.SignatureVerificationError:
+
+        for secret in STRIPE_WEBHOOK_SECRETS:
+            try:
+                stripe.WebhookSignature.verify_header(
+                    signed_payload, sig_header, secret, WEBHOOK_TOLERANCE_SECONDS
+                )
+                break
+            except stripe.error.SignatureVerificationError:
+                continue
+        else:
             raise HTTPException(status_code=400, detail="Invalid signature")
 
+        try:
+            return stripe.Event.construct_from(orjson.loads(payload), stripe.api_key)
+        except orjson.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid payload")
+
+    @staticmethod
+    async def handle_webhook(payload: bytes, sig_header: str) -> Dict:
+        """Handle Stripe webhook events"""
+        event = StripeService.construct_event(payload, sig_header)
+        return await StripeService.dispatch_event(event)
+
+    @staticmethod
+    async def dispatch_event(event: stripe.Event) -> Dict:
+        """Run the handler for an already-verified event"""
         event_type = event["type"]
-        data = event["data"]["object"]
-
-        # Handle different event types
-        handlers = {
-            "checkout.session.completed": handle_checkout_completed,
-            "customer.subscription.created": handle_subscription_created,
-            "customer.subscription.updated": handle_subscription_updated,
-            "customer.subscription.deleted": handle_subscription_deleted,
-            "invoice.payment_succeeded": handle_payment_succeeded,
-            "invoice.payment_failed": handle_payment_failed,
-        }
 
-        handler = handlers.get(event_type)
+        handler = WEBHOOK_HANDLERS.get(event_type)
         if handler:
-            return await handler(data)
+            return await handler(event["data"]["object"])
         
         return {"status": "unhandled_event", "type": event_type}
 
 
+# Webhook Idempotency
+
+# Events already applied, remembered in Redis for Stripe's full retry window
+PROCESSED_EVENT_CACHE_TTL_SECONDS = 3 * 24 * 60 * 60
+
+# Held while one delivery of an event is being applied; outlives any
+# realistic dispatch, and expires if the process dies mid-event
+EVENT_CLAIM_TTL_SECONDS = 60
+
+# Stripe serializes the event's own id first; nested object ids never start with evt_
+_EVENT_ID_PATTERN = re.compile(rb'"id"\s*:\s*"(evt_[A-Za-z0-9]+)"')
+_EVENT_ID_SCAN_BYTES = 200
+
+
+def processed_event_cache_key(event_id: str) -> str:
+    """Redis key marking a verified, fully processed event"""
+    return f"stripe_event:{event_id}"
+
+
+def event_claim_key(event_id: str) -> str:
+    """Redis key held by the delivery currently applying an event"""
+    return f"stripe_event_claim:{event_id}"
+
+
+def peek_event_id(payload: bytes) -> Optional[str]:
+    """
+    Pull the event id from the head of an unverified payload, without parsing
+
+    Only ever used to recognize replays of events we already verified and
+    processed: a forged id can at most earn a no-op "duplicate" 200, so
+    every other path still goes through full signature verification.
+    """
+    match = _EVENT_ID_PATTERN.search(payload, 0, _EVENT_ID_SCAN_BYTES)
+    return match.group(1).decode() if match else None
+
+
+async def is_event_processed(db, event_id: str) -> bool:
+    """Check whether a Stripe event was already handled (primary key lookup)"""
+    result = await db.execute(
+        text("SELECT 1 FROM processed_stripe_events WHERE event_id = :event_id"),
+        {"event_id": event_id}
+    )
+    return result.first() is not None
+
+
+async def mark_event_processed(db, event_id: str, event_type: str) -> bool:
+    """
+    Record a Stripe event as handled
+
+    Called only after its side effects succeed, so a failure mid-processing
+    leaves the event unrecorded and Stripe's retry runs it again.
+    Returns False if a concurrent delivery already recorded it.
+    """
+    result = await db.execute(
+        text(
+            "INSERT INTO processed_stripe_events (event_id, event_type) "
+            "VALUES (:event_id, :event_type) "
+            "ON CONFLICT DO NOTHING RETURNING event_id"
+        ),
+        {"event_id": event_id, "event_type": event_type}
+    )
+    await db.commit()
+    return result.first() is not None
+
+
 # Webhook Event Handlers
 
+async def _invalidate_user(stripe_object: Dict):
+    """Drop the cached user record for the user tagged in the object's metadata"""
+    user_id = (stripe_object.get("metadata") or {}).get("user_id")
+    if user_id:
+        await delete_generic_cache(user_cache_key(user_id))
+
+
 async def handle_checkout_completed(session: Dict) -> Dict:
     """Handle successful checkout"""
     customer_id = session.get("customer")
     subscription_id = session.get("subscription")
     
     # TODO: Update database with subscription info
+    await _invalidate_user(session)
     print(f"Checkout completed: customer={customer_id}, subscription={subscription_id}")
     
     return {
@@ -237,6 +457,7 @@ async def handle_subscription_created(subscription: Dict) -> Dict:
     status = subscription.get("status")
     
     # TODO: Update database
+    await _invalidate_user(subscription)
     print(f"Subscription created: {subscription_id} for customer {customer_id}")
     
     return {
@@ -252,6 +473,8 @@ async def handle_subscription_updated(subscription: Dict) -> Dict:
     status = subscription.get("status")
     
     # TODO: Update database with new plan details
+    await delete_generic_cache(subscription_cache_key(subscription_id))
+    await _invalidate_user(subscription)
     print(f"Subscription updated: {subscription_id}, status={status}")
     
     return {
@@ -266,6 +489,8 @@ async def handle_subscription_deleted(subscription: Dict) -> Dict:
     customer_id = subscription.get("customer")
     
     # TODO: Revoke access in database
+    await delete_generic_cache(subscription_cache_key(subscription_id))
+    await _invalidate_user(subscription)
     print(f"Subscription canceled: {subscription_id}")
     
     return {
@@ -304,6 +529,17 @@ async def handle_payment_failed(invoice: Dict) -> Dict:
     }
 
 
+# Event type -> handler; anything else is acknowledged without processing
+WEBHOOK_HANDLERS = {
+    "checkout.session.completed": handle_checkout_completed,
+    "customer.subscription.created": handle_subscription_created,
+    "customer.subscription.updated": handle_subscription_updated,
+    "customer.subscription.deleted": handle_subscription_deleted,
+    "invoice.payment_succeeded": handle_payment_succeeded,
+    "invoice.payment_failed": handle_payment_failed,
+}
+
+
 # Usage tracking and enforcement
 
 class UsageLimiter:
@@ -362,13 +598,15 @@ async def create_promo_code(
 ) -> Dict:
     """Create a promotional discount code"""
     try:
-        coupon = stripe.Coupon.create(
+        coupon = await _stripe_request(
+            stripe.Coupon.create,
             percent_off=discount_percent,
             duration=duration,
             max_redemptions=max_redemptions
         )
         
-        promo_code = stripe.PromotionCode.create(
+        promo_code = await _stripe_request(
+            stripe.PromotionCode.create,
             coupon=coupon.id,
             code=code,
         )
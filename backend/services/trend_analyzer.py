@@ -12,6 +12,13 @@ import asyncio
 import aiohttp
 from datetime import datetime, timedelta
 
+from .cache import swr_cached
+
+# Trends barely move within minutes: serve cached analyses for 10 minutes,
+# then serve them stale (refreshing in the background) for up to an hour
+TRENDS_FRESH_SECONDS = 600
+TRENDS_STALE_SECONDS = 3600
+
 class TrendAnalyzer:
     def __init__(self):
         self.anthropic_client = anthropic.Anthropic(
@@ -19,6 +26,11 @@ class TrendAnalyzer:
         )
         self.firecrawl_api_key = os.getenv('FIRECRAWL_API_KEY')
     
+    @swr_cached(
+        fresh_ttl=TRENDS_FRESH_SECONDS,
+        stale_ttl=TRENDS_STALE_SECONDS,
+        key=lambda self, platform='tiktok', niche=None, limit=10: f"trend:{platform}:{niche}:{limit}"
+    )
     async def analyze(
         self,
         platform: str = 'tiktok',
@@ -5,19 +5,56 @@ Built: December 13, 2025
 Company: RJ Business Solutions
 """
 
+import logging
 import os
+import shutil
 import subprocess
 import asyncio
+import aiofiles
+from fractions import Fraction
 from typing import Dict, Any, List
 import tempfile
 import uuid
 from pathlib import Path
 import json
+from urllib.parse import urlparse
 
 from .storage_manager import StorageManager
 
+logger = logging.getLogger(__name__)
+
 storage_manager = StorageManager()
 
+# NVENC/NVDEC when an NVIDIA GPU is present: decode, scale and encode stay on
+# the GPU. Otherwise libx264 with a fast preset. Cleared at runtime if this
+# ffmpeg build turns out to lack h264_nvenc/scale_cuda.
+USE_NVENC = shutil.which('nvidia-smi') is not None
+
+# ffmpeg stderr that means this build can't do NVENC at all. Anything else
+# (session limit, GPU out of memory) only falls back for that one job.
+NVENC_UNSUPPORTED_ERRORS = (
+    "Unknown encoder 'h264_nvenc'",
+    "No such filter: 'scale_cuda'",
+)
+
+# Protocols ffmpeg/ffprobe may open for a caller-supplied URL (no file:,
+# concat:, HLS playlists or other local/indirect inputs)
+REMOTE_INPUT_PROTOCOLS = 'http,https,tls,tcp'
+
+
+def _remote_input_args(video_url: str) -> List[str]:
+    """
+    ffmpeg/ffprobe input arguments for a caller-supplied video URL
+
+    Raises ValueError unless it is an http(s) URL, so it can never name a
+    local file, another protocol, or be parsed as an option.
+    """
+    parsed = urlparse(video_url)
+    if parsed.scheme not in ('http', 'https') or not parsed.netloc:
+        raise ValueError("video_url must be an http(s) URL")
+
+    return ['-protocol_whitelist', REMOTE_INPUT_PROTOCOLS, '-i', video_url]
+
 class VideoComposer:
     def __init__(self):
         self.temp_dir = Path(tempfile.gettempdir()) / "viral-engine-pro"
@@ -111,8 +148,10 @@ class VideoComposer:
         """
         async with session.get(url) as response:
             if response.status == 200:
-                with open(destination, 'wb') as f:
-                    f.write(await response.read())
+                # Stream to disk; never hold the whole file or block on the write
+                async with aiofiles.open(destination, 'wb') as f:
+                    async for chunk in response.content.iter_chunked(1024 * 1024):
+                        await f.write(chunk)
     
     def _build_ffmpeg_command(self, composition: Dict[str, Any], job_dir: Path) -> List[str]:
         """
@@ -398,9 +437,8 @@ class VideoComposer:
         """
         Clean up temporary files
         """
-        import shutil
         try:
-            shutil.rmtree(job_dir)
+            await asyncio.to_thread(shutil.rmtree, job_dir)
         except Exception as e:
             print(f"Cleanup warning: {str(e)}")
     
@@ -448,19 +486,47 @@ class VideoComposer:
             await self._download_file(session, video_url, input_file)
         
         # Optimize
-        cmd = [
-            'ffmpeg', '-y',
-            '-i', str(input_file),
-            '-vf', f"scale={platform_settings['resolution']['width']}:{platform_settings['resolution']['height']}",
-            '-c:v', 'libx264',
-            '-b:v', platform_settings['bitrate'],
-            '-c:a', 'aac',
-            '-b:a', '192k',
-            '-movflags', '+faststart',
-            str(output_file)
-        ]
-        
-        await self._execute_ffmpeg(cmd, output_file)
+        width = platform_settings['resolution']['width']
+        height = platform_settings['resolution']['height']
+        
+        def build_cmd(nvenc: bool) -> List[str]:
+            if nvenc:
+                cmd = [
+                    'ffmpeg', '-y',
+                    '-hwaccel', 'cuda', '-hwaccel_output_format', 'cuda',
+                    '-i', str(input_file),
+                    '-vf', f"scale_cuda={width}:{height}",
+                    '-c:v', 'h264_nvenc', '-preset', 'p4'
+                ]
+            else:
+                cmd = [
+                    'ffmpeg', '-y',
+                    '-i', str(input_file),
+                    '-vf', f"scale={width}:{height}",
+                    '-c:v', 'libx264', '-preset', 'veryfast'
+                ]
+            
+            return cmd + [
+                '-b:v', platform_settings['bitrate'],
+                '-c:a', 'aac',
+                '-b:a', '192k',
+                '-movflags', '+faststart',
+                str(output_file)
+            ]
+        
+        global USE_NVENC
+        if USE_NVENC:
+            try:
+                await self._execute_ffmpeg(build_cmd(nvenc=True), output_file)
+            except Exception as e:
+                if any(marker in str(e) for marker in NVENC_UNSUPPORTED_ERRORS):
+                    logger.warning(f"ffmpeg lacks NVENC support, using libx264 from now on: {e}")
+                    USE_NVENC = False
+                else:
+                    logger.warning(f"NVENC encode failed, retrying this job with libx264: {e}")
+                await self._execute_ffmpeg(build_cmd(nvenc=False), output_file)
+        else:
+            await self._execute_ffmpeg(build_cmd(nvenc=False), output_file)
         
         # Upload
         optimized_url = await storage_manager.upload_video(output_file, f"{job_id}_optimized")
@@ -474,24 +540,23 @@ class VideoComposer:
         """
         Generate thumbnail from video
         """
+        input_args = _remote_input_args(video_url)
+        
         job_id = f"thumb_{uuid.uuid4().hex}"
         job_dir = self.temp_dir / job_id
         job_dir.mkdir(exist_ok=True)
         
-        input_file = job_dir / "input.mp4"
         output_file = job_dir / "thumbnail.jpg"
         
-        # Download video
-        import aiohttp
-        async with aiohttp.ClientSession() as session:
-            await self._download_file(session, video_url, input_file)
-        
-        # Extract frame
+        # Extract frame: -ss before -i seeks the input to the nearest
+        # keyframe (range requests on a URL) instead of decoding up to the
+        # timestamp, so the video is never downloaded whole
         cmd = [
             'ffmpeg', '-y',
-            '-i', str(input_file),
+            '-hwaccel', 'auto',
             '-ss', str(timestamp),
-            '-vframes', '1',
+            *input_args,
+            '-frames:v', '1',
             '-q:v', '2',
             str(output_file)
         ]
@@ -509,26 +574,17 @@ class VideoComposer:
     async def get_metadata(self, video_url: str) -> Dict[str, Any]:
         """
         Get video metadata using ffprobe
-        """
-        job_id = f"meta_{uuid.uuid4().hex}"
-        job_dir = self.temp_dir / job_id
-        job_dir.mkdir(exist_ok=True)
         
-        input_file = job_dir / "input.mp4"
-        
-        # Download video
-        import aiohttp
-        async with aiohttp.ClientSession() as session:
-            await self._download_file(session, video_url, input_file)
-        
-        # Get metadata
+        ffprobe reads the URL directly, fetching only the container headers
+        with HTTP range requests instead of downloading the whole video.
+        """
         cmd = [
             'ffprobe',
-            '-v', 'quiet',
+            '-v', 'error',
             '-print_format', 'json',
             '-show_format',
             '-show_streams',
-            str(input_file)
+            *_remote_input_args(video_url)
         ]
         
         process = await asyncio.create_subprocess_exec(
@@ -554,15 +610,12 @@ class VideoComposer:
             'duration': float(metadata['format']['duration']),
             'width': video_stream['width'] if video_stream else 0,
             'height': video_stream['height'] if video_stream else 0,
-            'fps': eval(video_stream['r_frame_rate']) if video_stream else 0,
-            'bitrate': int(metadata['format']['bit_rate']),
+            'fps': float(Fraction(video_stream['r_frame_rate'])) if video_stream else 0,
+            'bitrate': int(metadata['format'].get('bit_rate', 0)),
             'codec': video_stream['codec_name'] if video_stream else 'unknown',
-            'fileSize': int(metadata['format']['size'])
+            'fileSize': int(metadata['format'].get('size', 0))  # unknown without Content-Length
         }
         
-        # Cleanup
-        await self._cleanup(job_dir)
-        
         return result
     
     async def process_generation(self, job_id: str, request: Any):
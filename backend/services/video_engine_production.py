@@ -580,6 +580,11 @@ class ProductionVideoEngine:
         if os.path.exists(self.temp_dir):
             shutil.rmtree(self.temp_dir)
             logger.info(f"Cleaned up temp dir: {self.temp_dir}")
+    
+    def reset(self):
+        """Clear temporary files but keep the engine usable (for pooled reuse)"""
+        self.cleanup()
+        os.makedirs(self.temp_dir, exist_ok=True)
 
 
 # ═══════════════════════════════════════════════════════════════
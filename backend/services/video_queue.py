@@ -0,0 +1,339 @@
+"""
+Video Job Queue for Viral Engine Pro
+Celery tasks for rendering off the API process + per-user concurrency limits
+"""
+
+import asyncio
+import logging
+import os
+import queue
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import redis
+from celery import Celery
+from fastapi import HTTPException
+
+from .cache import get_redis
+from .storage_manager import StorageManager
+from .video_engine_production import ProductionVideoEngine, CaptionStyle
+
+logger = logging.getLogger(__name__)
+
+CELERY_BROKER_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+celery_app = Celery("viral_engine", broker=CELERY_BROKER_URL, backend=CELERY_BROKER_URL)
+celery_app.conf.update(
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,  # renders are long; don't hoard jobs per worker
+)
+
+# Concurrent renders allowed per user, by tier
+MAX_CONCURRENT_VIDEOS = {
+    "free": 1,
+    "pro": 5,
+    "business": 20,
+    "enterprise": 50
+}
+
+# Slots older than this are treated as leaked (worker died before releasing)
+ACTIVE_VIDEO_STALE_SECONDS = 3600
+
+# Global render concurrency, adapted by AIMD on observed render latency:
+# additive increase while the mean of the last samples is on target,
+# multiplicative decrease (at most once per interval) when it is slow or a
+# render fails for infrastructure reasons
+RENDER_CONCURRENCY_MIN = 4
+RENDER_CONCURRENCY_MAX = 200
+RENDER_CONCURRENCY_INCREASE = 0.5
+RENDER_CONCURRENCY_DECREASE = 0.5
+RENDER_LATENCY_TARGET_SECONDS = 120
+RENDER_LATENCY_SAMPLES = 100
+RENDER_DECREASE_INTERVAL_SECONDS = 60
+
+# Failures caused by the job itself (bad template, missing source, malformed
+# request) say nothing about render capacity and are not fed to AIMD
+RENDER_INPUT_ERRORS = (KeyError, ValueError, TypeError, FileNotFoundError)
+OVERLOADED_RETRY_AFTER_SECONDS = 30
+
+ACTIVE_VIDEOS_ALL_KEY = "active_videos:all"
+RENDER_LATENCIES_KEY = "render_latencies"
+RENDER_CONCURRENCY_KEY = "render_concurrency_limit"
+RENDER_LAST_DECREASE_KEY = "render_concurrency_last_decrease"
+
+# Drop stale slots, then admit all ids or none.
+# Returns 1 (admitted), 0 (user limit reached) or -1 (global limit reached).
+ACQUIRE_SLOTS_SCRIPT = """
+local user_key = KEYS[1]
+local all_key = KEYS[2]
+local now = tonumber(ARGV[1])
+local stale_before = tonumber(ARGV[2])
+local user_limit = tonumber(ARGV[3])
+local ttl = tonumber(ARGV[4])
+local global_limit = math.floor(tonumber(redis.call('GET', KEYS[3]) or ARGV[5]))
+local count = #ARGV - 5
+
+redis.call('ZREMRANGEBYSCORE', user_key, '-inf', stale_before)
+redis.call('ZREMRANGEBYSCORE', all_key, '-inf', stale_before)
+
+if redis.call('ZCARD', user_key) + count > user_limit then
+    return 0
+end
+
+if redis.call('ZCARD', all_key) + count > global_limit then
+    return -1
+end
+
+for i = 6, #ARGV do
+    redis.call('ZADD', user_key, now, ARGV[i])
+    redis.call('ZADD', all_key, now, ARGV[i])
+end
+redis.call('EXPIRE', user_key, ttl)
+redis.call('EXPIRE', all_key, ttl)
+return 1
+"""
+
+# Record one render latency and apply the AIMD step; returns the new limit.
+# Decreases are spaced at least `interval` apart, so one slow burst (the mean
+# stays high for many completions) costs one halving, not one per render.
+RECORD_RENDER_SCRIPT = """
+local latency = ARGV[1]
+local ok = ARGV[2] == '1'
+local samples = tonumber(ARGV[3])
+local target = tonumber(ARGV[4])
+local c_min = tonumber(ARGV[5])
+local c_max = tonumber(ARGV[6])
+local alpha = tonumber(ARGV[7])
+local beta = tonumber(ARGV[8])
+local now = tonumber(ARGV[9])
+local interval = tonumber(ARGV[10])
+
+redis.call('LPUSH', KEYS[1], latency)
+redis.call('LTRIM', KEYS[1], 0, samples - 1)
+
+local total = 0
+local latencies = redis.call('LRANGE', KEYS[1], 0, -1)
+for _, value in ipairs(latencies) do
+    total = total + tonumber(value)
+end
+local mean = total / #latencies
+
+local c = tonumber(redis.call('GET', KEYS[2]) or c_max)
+if ok and mean <= target then
+    c = math.min(c_max, c + alpha)
+elseif now - tonumber(redis.call('GET', KEYS[3]) or 0) >= interval then
+    c = math.max(c_min, c * beta)
+    redis.call('SET', KEYS[3], tostring(now))
+end
+
+redis.call('SET', KEYS[2], tostring(c))
+return tostring(c)
+"""
+
+_acquire_slots_script = None
+_record_render_script = None
+_worker_redis: Optional[redis.Redis] = None
+
+# Worker-side singletons: one storage client per process, and a pool of
+# render engines (ffmpeg lookup + temp dir) reused across tasks
+_storage = StorageManager()
+_engine_pool: "queue.SimpleQueue[ProductionVideoEngine]" = queue.SimpleQueue()
+
+
+def _active_videos_key(user_id: str) -> str:
+    return f"active_videos:{user_id}"
+
+
+def _get_worker_redis() -> redis.Redis:
+    global _worker_redis
+
+    if _worker_redis is None:
+        _worker_redis = redis.Redis.from_url(CELERY_BROKER_URL)
+
+    return _worker_redis
+
+
+# Admission (API side)
+
+async def acquire_video_slots(user_id: str, tier: str, video_ids: List[str]):
+    """
+    Reserve one render slot per video id, atomically (all or none)
+
+    Raises 429 if the user's tier limit would be exceeded, or 503 with
+    Retry-After if the adaptive global limit would be. Always admits when
+    Redis is not configured.
+    """
+    global _acquire_slots_script
+
+    client = await get_redis()
+    if client is None:
+        return
+
+    if _acquire_slots_script is None:
+        _acquire_slots_script = client.register_script(ACQUIRE_SLOTS_SCRIPT)
+
+    now = time.time()
+    admitted = await _acquire_slots_script(
+        keys=[_active_videos_key(user_id), ACTIVE_VIDEOS_ALL_KEY, RENDER_CONCURRENCY_KEY],
+        args=[
+            now,
+            now - ACTIVE_VIDEO_STALE_SECONDS,
+            MAX_CONCURRENT_VIDEOS.get(tier, 1),
+            ACTIVE_VIDEO_STALE_SECONDS,
+            RENDER_CONCURRENCY_MAX,
+            *video_ids
+        ]
+    )
+
+    if admitted == 0:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many videos rendering. Wait for current renders to finish."
+        )
+
+    if admitted == -1:
+        raise HTTPException(
+            status_code=503,
+            detail="Render queue is busy. Try again shortly.",
+            headers={"Retry-After": str(OVERLOADED_RETRY_AFTER_SECONDS)}
+        )
+
+
+async def release_video_slots(user_id: str, video_ids: List[str]):
+    """Give back slots that were reserved but never enqueued"""
+    client = await get_redis()
+    if client is not None and video_ids:
+        await client.zrem(_active_videos_key(user_id), *video_ids)
+        await client.zrem(ACTIVE_VIDEOS_ALL_KEY, *video_ids)
+
+
+def _release_video_slot(user_id: str, video_id: str):
+    """Give back a slot once its render finishes (worker side)"""
+    client = _get_worker_redis()
+    client.zrem(_active_videos_key(user_id), video_id)
+    client.zrem(ACTIVE_VIDEOS_ALL_KEY, video_id)
+
+
+def _record_render(latency: float, ok: bool):
+    """Feed one render outcome into the AIMD global concurrency limit"""
+    global _record_render_script
+
+    if _record_render_script is None:
+        _record_render_script = _get_worker_redis().register_script(RECORD_RENDER_SCRIPT)
+
+    _record_render_script(
+        keys=[RENDER_LATENCIES_KEY, RENDER_CONCURRENCY_KEY, RENDER_LAST_DECREASE_KEY],
+        args=[
+            latency,
+            1 if ok else 0,
+            RENDER_LATENCY_SAMPLES,
+            RENDER_LATENCY_TARGET_SECONDS,
+            RENDER_CONCURRENCY_MIN,
+            RENDER_CONCURRENCY_MAX,
+            RENDER_CONCURRENCY_INCREASE,
+            RENDER_CONCURRENCY_DECREASE,
+            time.time(),
+            RENDER_DECREASE_INTERVAL_SECONDS
+        ]
+    )
+
+
+@contextmanager
+def acquire_engine():
+    """
+    Borrow a render engine from the pool (created on first use)
+
+    The pool grows to the worker's concurrency and no further; engines are
+    reset (temp files cleared) before going back.
+    """
+    try:
+        engine = _engine_pool.get_nowait()
+    except queue.Empty:
+        engine = ProductionVideoEngine()
+
+    try:
+        yield engine
+    finally:
+        engine.reset()
+        _engine_pool.put(engine)
+
+
+# Tasks (worker side)
+
+@celery_app.task(name="videos.generate")
+def generate_video(
+    video_id: str,
+    request: Dict,
+    user_id: str,
+    batch_id: Optional[str] = None
+):
+    """
+    Render a video and upload it to storage
+    """
+    started = time.monotonic()
+    ok = False
+    input_error = False
+
+    try:
+        # Update status to processing
+        # TODO: Update in database
+
+        captions = [CaptionStyle(**cap) for cap in request.get("captions", [])]
+
+        with acquire_engine() as engine:
+            output_path = engine.create_viral_video(
+                template_id=request["template_id"],
+                script=request["script"],
+                background_video=request.get("background_source"),
+                music_path=request["music_source"],
+                platform=request["platform"],
+                captions=captions if captions else None,
+                logo_path="assets/logo.png" if request.get("add_logo") else None
+            )
+
+            download_url = asyncio.run(_storage.upload_video(Path(output_path), video_id))
+
+        # Update status to completed
+        # TODO: Update in database with download_url
+
+        ok = True
+
+    except Exception as e:
+        # Update status to failed
+        # TODO: Update in database with error
+        input_error = isinstance(e, RENDER_INPUT_ERRORS)
+        logger.exception(f"Video generation failed for {video_id}")
+
+    finally:
+        _release_video_slot(user_id, video_id)
+        if not input_error:
+            _record_render(time.monotonic() - started, ok)
+
+
+@celery_app.task(name="videos.trim")
+def trim_video(
+    original_video_id: str,
+    new_video_id: str,
+    start_time: float,
+    end_time: float,
+    user_id: str
+):
+    """
+    Trim a video to specific duration
+    """
+    pass
+
+
+@celery_app.task(name="videos.optimize")
+def optimize_video(
+    original_video_id: str,
+    new_video_id: str,
+    target_platform: str,
+    user_id: str
+):
+    """
+    Re-encode a video for a different platform
+    """
+    pass